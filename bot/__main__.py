@@ -1,25 +1,55 @@
 from aiogram import Dispatcher
 from aiogram.utils import executor
 from bot.commands import set_default_commands
-from bot.loader import db, dp
+from bot.loader import db, dp, profiles, references
+from bot.webhook import create_web_app, SecretWebhookRequestHandler
 from loguru import logger
 
+import os
+
 
 async def startup(dp: Dispatcher) -> None:
     """initialization"""
     await db.create_tables()
     await set_default_commands(dp)
+    await references.load()
     logger.info("bot started")
 
 
 async def shutdown(dp: Dispatcher) -> None:
     """and need to close Redis and PostgreSQL connection when shutdown"""
+    await references.close()
     await db.close_database()
+    await profiles.close()
     await dp.storage.close()
     await dp.storage.wait_closed()
     logger.info("bot finished")
 
 
+def start_webhook() -> None:
+    """webhook mode: several replicas can serve one bot behind a load balancer, FSM state lives in Redis"""
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret:
+        raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+    path = os.getenv("WEBHOOK_PATH", "/webhook")
+    url = os.getenv("WEBHOOK_URL")
+    max_in_flight = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", 40))
+
+    async def set_webhook(dp: Dispatcher) -> None:
+        # without WEBHOOK_URL the webhook is registered elsewhere, e.g. when replaying updates locally
+        if url:
+            await dp.bot.set_webhook(url + path, secret_token=secret, max_connections=min(max_in_flight, 100))
+            logger.info(f"webhook set | url: {url + path}")
+
+    # the webhook is not deleted on shutdown, other replicas keep serving it
+    webhook_executor = executor.Executor(dp)
+    webhook_executor.on_startup([startup, set_webhook], polling=False)
+    webhook_executor.on_shutdown(shutdown, polling=False)
+    webhook_executor.set_webhook(path, request_handler=SecretWebhookRequestHandler,
+                                 web_app=create_web_app(secret, max_in_flight))
+    webhook_executor.run_app(host=os.getenv("WEBHOOK_HOST", "0.0.0.0"), port=int(os.getenv("WEBHOOK_PORT", 8081)))
+
+
 if __name__ == "__main__":
     logger.add(
         "logs/debug.log",
@@ -28,4 +58,7 @@ if __name__ == "__main__":
         rotation="30 KB",
         compression="zip",
     )
-    executor.start_polling(dp, skip_updates=True, on_startup=startup, on_shutdown=shutdown)
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        start_webhook()
+    else:
+        executor.start_polling(dp, skip_updates=True, on_startup=startup, on_shutdown=shutdown)
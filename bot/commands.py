@@ -8,5 +8,7 @@ async def set_default_commands(dp: Dispatcher) -> None:
             types.BotCommand("contacts", "developer contact details"),
             types.BotCommand("settings", "setting information about you"),
             types.BotCommand("chose_strategy", "chose nahui"),
+            types.BotCommand("status", "ticker vs its EMA now"),
+            types.BotCommand("watchlist", "status of your tickers"),
         ]
     )
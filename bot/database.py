@@ -62,12 +62,17 @@ class Database:
     async def get_lang(self, user_id: int) -> str:
         return await self.pool.fetchval(f"SELECT lang FROM Users WHERE user_id={user_id}")
 
+    async def get_profile(self, user_id: int) -> Optional[dict]:
+        """name and language of the user in one query, None if the user is unknown."""
+        row = await self.pool.fetchrow("SELECT name, lang FROM Users WHERE user_id=$1", user_id)
+        return dict(row) if row else None
+
     async def get_strategies(self):
-        response = await self.pool.fetch("SELECT strategy_id, name FROM strategy")
+        response = await self.pool.fetch("SELECT strategy_id, name FROM strategies ORDER BY strategy_id")
         return response
 
     async def get_time_frames(self):
-        response = await self.pool.fetch("SELECT timeframe_id, name FROM timeframes")
+        response = await self.pool.fetch("SELECT timeframe_id, name FROM timeframes ORDER BY timeframe_id")
         return response
 
     async def save_strategy(self, user_id, strategy_id, timeframe_id):
@@ -88,6 +93,46 @@ class Database:
         query = f"INSERT INTO user_tickers (user_id, ticker_id) VALUES ({user_id}, {ticker_id})"
         await self.pool.execute(query)
 
+    async def subscribe_tickers(self, user_id: int, tickers: list[str]) -> list[asyncpg.Record]:
+        """adds missing tickers and subscribes the user to all of them in one statement."""
+        # Строки, вставленные в CTE, не видны соседнему SELECT из tickers, поэтому UNION ALL не дает дублей
+        query = """
+            WITH names AS (
+                SELECT DISTINCT unnest($2::varchar[]) AS name
+            ), inserted_tickers AS (
+                INSERT INTO tickers (name)
+                SELECT name FROM names
+                ON CONFLICT (name) DO NOTHING
+                RETURNING ticker_id, name, figi, disable
+            ), requested AS (
+                SELECT ticker_id, name, figi, disable FROM inserted_tickers
+                UNION ALL
+                SELECT t.ticker_id, t.name, t.figi, t.disable FROM tickers t JOIN names n ON n.name = t.name
+            ), subscribed AS (
+                INSERT INTO user_tickers (user_id, ticker_id)
+                SELECT $1, ticker_id FROM requested
+                ON CONFLICT (user_id, ticker_id) DO NOTHING
+                RETURNING ticker_id
+            )
+            SELECT r.ticker_id, r.name,
+                   r.figi IS NOT NULL AND NOT coalesce(r.disable, FALSE) AS known,
+                   r.ticker_id IN (SELECT ticker_id FROM subscribed) AS subscribed
+            FROM requested r
+            ORDER BY r.name;
+        """
+        return await self.pool.fetch(query, user_id, tickers)
+
+    async def get_user_ticker_names(self, user_id: int) -> list[str]:
+        query = """
+            SELECT t.name
+            FROM user_tickers ut
+            JOIN tickers t ON t.ticker_id = ut.ticker_id
+            WHERE ut.user_id = $1
+            ORDER BY t.name;
+        """
+        rows = await self.pool.fetch(query, user_id)
+        return [row["name"] for row in rows]
+
     async def get_tickers_without_figi(self) -> list[Ticker]:
         query = f"SELECT * FROM tickers WHERE figi IS NULL"
         results = await self.pool.fetch(query)
@@ -1,12 +1,14 @@
 from aiogram import types
-from bot.loader import bot, db, dp
+from bot.loader import bot, db, dp, profiles, references, statuses
 from bot.texts import button_texts, message_texts
+from bot.ticker_status import format_status
+from market_loader.notifier import split_digest
 
 
 @dp.message_handler(commands="start")
 async def start_message(message: types.Message) -> None:
     """welcome message."""
-    if await db.verification(message.from_user.id):
+    if await profiles.get(message.from_user.id):
         await bot.send_message(message.chat.id, message_texts["welcome"])
     else:
         if message.from_user.first_name != "None":
@@ -17,7 +19,7 @@ async def start_message(message: types.Message) -> None:
             name = message.from_user.last_name
         else:
             name = ""
-        await db.add_user(message.from_user.id, name, message.from_user.locale.language_name)
+        await profiles.add_user(message.from_user.id, name, message.from_user.locale.language_name)
         await bot.send_message(message.chat.id, message_texts["about"])
 
 
@@ -42,32 +44,25 @@ async def give_contacts(message: types.Message) -> None:
 
 @dp.message_handler(commands="chose_strategy")
 async def chose_strategy(message: types.Message) -> None:
-    """ссылка на код проекта."""
-    strategies = await db.get_strategies()
-    keyboard_link = types.InlineKeyboardMarkup()
-    for strategy in strategies:
-        btn_command = types.InlineKeyboardButton(text=strategy[1], callback_data=f"strategy_{strategy[0]}")
-        keyboard_link.add(btn_command)
-
+    """выбор стратегии."""
     await bot.send_message(
         message.chat.id,
         'Доступные стратегии',
-        reply_markup=keyboard_link,
+        reply_markup=await references.get_strategy_keyboard(),
     )
 
 @dp.callback_query_handler(lambda c: c.data.startswith('strategy_'))
 async def process_strategy_button(callback_query: types.CallbackQuery):
     strategy_id = callback_query.data[len('strategy_'):]
-    timeframes = await db.get_time_frames()
-    keyboard_link = types.InlineKeyboardMarkup()
-    for timeframe in timeframes:
-        btn_command = types.InlineKeyboardButton(text=timeframe[1], callback_data=f"timeframe_{timeframe[0]}_{strategy_id}")
-        keyboard_link.add(btn_command)
+    keyboard = await references.get_timeframe_keyboard(strategy_id)
+    if keyboard is None:
+        await bot.answer_callback_query(callback_query.id, 'Стратегия больше недоступна')
+        return
 
     await bot.send_message(
         callback_query.message.chat.id,
         'Доступные временные окна',
-        reply_markup=keyboard_link,
+        reply_markup=keyboard,
     )
 
 
@@ -85,8 +80,9 @@ async def process_strategy_button(callback_query: types.CallbackQuery):
 @dp.message_handler(commands="settings")
 async def give_settings(message: types.Message) -> None:
     """справка по настройкам."""
-    name = await db.get_name(message.from_user.id)
-    lang = await db.get_lang(message.from_user.id)
+    profile = await profiles.get(message.from_user.id) or {}
+    name = profile.get("name")
+    lang = profile.get("lang")
     btn_name = types.InlineKeyboardButton(text=f"name: {name}", callback_data="name")
     btn_lang = types.InlineKeyboardButton(text=f"language: {lang}", callback_data="lang")
     keyboard_settings = types.InlineKeyboardMarkup().add(btn_name, btn_lang)
@@ -105,19 +101,59 @@ async def alter_lang(callback_query: types.CallbackQuery) -> None:
     await bot.answer_callback_query(callback_query.id, message_texts["language"])
 
 
+@dp.message_handler(commands="status")
+async def give_status(message: types.Message) -> None:
+    """положение тикера относительно EMA."""
+    name = message.get_args().strip().upper()
+    if not name:
+        await bot.send_message(message.chat.id, 'Укажи тикер. Пример: /status SBER')
+        return
+    status = (await statuses.get([name]))[name]
+    await bot.send_message(
+        message.chat.id,
+        format_status(status) if status else f'Нет данных по {name}, аби.',
+    )
+
+
+@dp.message_handler(commands="watchlist")
+async def give_watchlist(message: types.Message) -> None:
+    """положение всех тикеров пользователя."""
+    names = await db.get_user_ticker_names(message.from_user.id)
+    if not names:
+        await bot.send_message(message.chat.id, 'Список пуст. Пример ввода - tickers: AAPL, AMZN, GAZP')
+        return
+    ticker_statuses = await statuses.get(names)
+    missing = [name for name, status in ticker_statuses.items() if status is None]
+    parts = [format_status(status) for status in ticker_statuses.values() if status]
+    if missing:
+        parts.append(f"Нет данных: {', '.join(missing)}")
+    for digest in split_digest(parts):
+        await bot.send_message(message.chat.id, digest)
+
+
+def get_subscription_message(subscriptions) -> str:
+    new = [row["name"] for row in subscriptions if row["subscribed"] and row["known"]]
+    tracked = [row["name"] for row in subscriptions if not row["subscribed"] and row["known"]]
+    unknown = [row["name"] for row in subscriptions if not row["known"]]
+    lines = []
+    if new:
+        lines.append(f"Тикеры добавлены, аби. Теперь жди топовых сигналов: {', '.join(new)}")
+    if tracked:
+        lines.append(f"Уже отслеживаются: {', '.join(tracked)}")
+    if unknown:
+        lines.append(f"Пока неизвестны бирже, начнем следить после загрузки: {', '.join(unknown)}")
+    return "\n".join(lines) or "Не нашел тикеров в сообщении, аби."
+
+
 @dp.message_handler(content_types="text")
 async def text_handler(message: types.Message) -> None:
     if 'tickers: ' in message.text:
         clean_data = message.text.replace('tickers: ', '')
-        data = clean_data.split(',')
-        for ticker_raw in data:
-            ticker = ticker_raw.strip()
-            await db.add_ticker(ticker=ticker)
-            ticker_id = await db.get_ticker_id_by_name(ticker=ticker)
-            await db.add_user_ticker(user_id=message.from_user.id, ticker_id=ticker_id)
+        tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in clean_data.split(',') if ticker.strip()))
+        subscriptions = await db.subscribe_tickers(user_id=message.from_user.id, tickers=tickers) if tickers else []
         await bot.send_message(
             message.chat.id,
-            'Тикеры добавлены, аби. Теперь жди топовых сигналов.',
+            get_subscription_message(subscriptions),
         )
     else:
         await bot.send_message(
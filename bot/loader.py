@@ -1,7 +1,11 @@
 from aiogram import Bot, Dispatcher
 from aiogram.contrib.fsm_storage.redis import RedisStorage2
 from bot.database import Database
+from bot.profile_cache import ProfileCache
+from bot.reference_cache import ReferenceDataCache
+from bot.ticker_status import TickerStatusReader
 from dotenv import load_dotenv
+from redis.asyncio import Redis
 
 import asyncio
 import os
@@ -23,3 +27,7 @@ db = Database(
     port=os.getenv("PG_PORT"),
     loop=loop,
 )
+redis = Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), db=5, decode_responses=True)
+profiles = ProfileCache(redis, db)
+references = ReferenceDataCache(db)
+statuses = TickerStatusReader(redis)
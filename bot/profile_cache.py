@@ -0,0 +1,53 @@
+import json
+from typing import Optional
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from bot.database import Database
+
+profile_ttl = 3600
+
+
+class ProfileCache:
+    """user profiles cached in the shared Redis, so every bot instance skips Postgres for known users."""
+
+    def __init__(self, redis: Redis, db: Database, ttl: int = profile_ttl, prefix: str = "profile") -> None:
+        self.redis = redis
+        self.db = db
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        """profile of the user, None if the user is not registered."""
+        try:
+            cached = await self.redis.get(self._key(user_id))
+        except RedisError as e:
+            logger.warning(f"profile cache unavailable: {e}")
+            return await self.db.get_profile(user_id)
+        if cached is not None:
+            return json.loads(cached)
+        profile = await self.db.get_profile(user_id)
+        # unknown users are cached too, add_user drops the entry
+        try:
+            await self.redis.set(self._key(user_id), json.dumps(profile), ex=self.ttl)
+        except RedisError as e:
+            logger.warning(f"profile cache unavailable: {e}")
+        return profile
+
+    async def invalidate(self, user_id: int) -> None:
+        try:
+            await self.redis.delete(self._key(user_id))
+        except RedisError as e:
+            logger.warning(f"profile cache unavailable: {e}")
+
+    async def add_user(self, user_id: int, name: str, lang: str) -> None:
+        await self.db.add_user(user_id, name, lang)
+        await self.invalidate(user_id)
+
+    async def close(self) -> None:
+        await self.redis.close()
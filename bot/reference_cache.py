@@ -0,0 +1,81 @@
+import asyncio
+from typing import Optional
+
+import asyncpg
+from aiogram import types
+from loguru import logger
+
+from bot.database import Database
+
+reference_data_channel = "reference_data"
+
+
+class ReferenceDataCache:
+    """strategies, timeframes and their menus, reloaded only when Postgres reports a change."""
+
+    def __init__(self, db: Database, channel: str = reference_data_channel) -> None:
+        self.db = db
+        self.channel = channel
+        self.connection: Optional[asyncpg.Connection] = None
+        self.stale = True
+        self.lock = asyncio.Lock()
+        self.strategy_keyboard: Optional[str] = None
+        self.timeframe_keyboards: dict[str, str] = {}
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        logger.info(f"reference data changed | table: {payload}")
+        self.stale = True
+
+    def _on_terminate(self, connection) -> None:
+        # notifications may be lost while the connection is down, so reload on the next request
+        logger.warning("reference data listener disconnected")
+        self.connection = None
+        self.stale = True
+        asyncio.ensure_future(self.db.pool.release(connection))
+
+    async def _listen(self) -> None:
+        self.connection = await self.db.pool.acquire()
+        self.connection.add_termination_listener(self._on_terminate)
+        await self.connection.add_listener(self.channel, self._on_notify)
+
+    async def load(self) -> None:
+        # listen before reading, so a change between the two is not missed
+        if self.connection is None:
+            await self._listen()
+        self.stale = False
+        strategies = await self.db.get_strategies()
+        timeframes = await self.db.get_time_frames()
+        keyboard = types.InlineKeyboardMarkup()
+        for strategy in strategies:
+            keyboard.add(types.InlineKeyboardButton(text=strategy[1], callback_data=f"strategy_{strategy[0]}"))
+        self.strategy_keyboard = keyboard.as_json()
+        self.timeframe_keyboards = {}
+        for strategy in strategies:
+            keyboard = types.InlineKeyboardMarkup()
+            for timeframe in timeframes:
+                keyboard.add(types.InlineKeyboardButton(text=timeframe[1],
+                                                        callback_data=f"timeframe_{timeframe[0]}_{strategy[0]}"))
+            self.timeframe_keyboards[str(strategy[0])] = keyboard.as_json()
+        logger.info(f"reference data loaded | strategies: {len(strategies)}; timeframes: {len(timeframes)}")
+
+    async def _refresh(self) -> None:
+        async with self.lock:
+            if self.stale:
+                await self.load()
+
+    async def get_strategy_keyboard(self) -> str:
+        if self.stale:
+            await self._refresh()
+        return self.strategy_keyboard
+
+    async def get_timeframe_keyboard(self, strategy_id: str) -> Optional[str]:
+        if self.stale:
+            await self._refresh()
+        return self.timeframe_keyboards.get(strategy_id)
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            connection.remove_termination_listener(self._on_terminate)
+            await connection.remove_listener(self.channel, self._on_notify)
+            await self.db.pool.release(connection)
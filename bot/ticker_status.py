@@ -0,0 +1,41 @@
+from typing import Optional
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from market_loader.constants import ema_cross_window, status_key
+from market_loader.models import TickerStatus
+from market_loader.utils import convert_utc_to_local, get_interval_form_str
+
+
+class TickerStatusReader:
+    """ticker status published by the market loader after each cycle."""
+
+    def __init__(self, redis: Redis, key: str = status_key) -> None:
+        self.redis = redis
+        self.key = key
+
+    async def get(self, names: list[str]) -> dict[str, Optional[TickerStatus]]:
+        if not names:
+            return {}
+        try:
+            values = await self.redis.hmget(self.key, names)
+        except RedisError as e:
+            logger.warning(f"ticker status unavailable: {e}")
+            values = [None] * len(names)
+        return {name: TickerStatus.model_validate_json(value) if value else None for name, value in zip(names, values)}
+
+
+def format_status(status: TickerStatus) -> str:
+    lines = [f"<b>{status.name}</b> {get_interval_form_str(status.interval)}, "
+             f"{convert_utc_to_local(status.timestamp_column)}",
+             f"Close: {status.close}"]
+    for index, (span, ema) in enumerate(sorted(status.emas.items())):
+        distance = f" ({status.atr_distance:+} ATR)" if index == 0 and status.atr_distance is not None else ""
+        lines.append(f"EMA {span}: {round(ema, 4)}{distance}")
+    if status.atr_percent is not None:
+        lines.append(f"ATR: {status.atr_percent}%")
+    if status.emas:
+        lines.append(f"Пересечений EMA {min(status.emas)} за {ema_cross_window} часа: {status.cross_count}")
+    return "\n".join(lines)
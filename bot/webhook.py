@@ -0,0 +1,35 @@
+import asyncio
+import hmac
+
+from aiogram.dispatcher.webhook import WebhookRequestHandler
+from aiohttp import web
+from loguru import logger
+
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+WEBHOOK_SECRET_KEY = "WEBHOOK_SECRET"
+WEBHOOK_SEMAPHORE_KEY = "WEBHOOK_SEMAPHORE"
+
+
+class SecretWebhookRequestHandler(WebhookRequestHandler):
+    """webhook handler that checks the secret token and bounds the number of updates processed at once."""
+
+    def validate_secret(self) -> None:
+        secret = self.request.app[WEBHOOK_SECRET_KEY]
+        token = self.request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), secret.encode()):
+            logger.warning(f"webhook request with invalid secret token | from: {self.request.remote}")
+            raise web.HTTPUnauthorized()
+
+    async def post(self):
+        self.validate_secret()
+        # until a slot frees up the request waits, Telegram does not send more than max_connections at once
+        async with self.request.app[WEBHOOK_SEMAPHORE_KEY]:
+            return await super().post()
+
+
+def create_web_app(secret: str, max_in_flight: int) -> web.Application:
+    app = web.Application()
+    app[WEBHOOK_SECRET_KEY] = secret
+    app[WEBHOOK_SEMAPHORE_KEY] = asyncio.Semaphore(max_in_flight)
+    return app
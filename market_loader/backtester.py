@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from market_loader.constants import backtest_cache_dir, backtest_horizons, history_workers
+from market_loader.infrasturcture.entities import get_sessionmaker
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import BacktestParams, CandleInterval
+from market_loader.utils import get_start_time
+
+BacktestData = dict[int, tuple[pd.DataFrame, pd.DataFrame]]
+
+_worker_data: BacktestData = {}
+_worker_windows: dict[tuple[int, int], np.ndarray] = {}
+
+
+def _init_worker(data: BacktestData, windows: list[int]) -> None:
+    global _worker_data, _worker_windows
+    _worker_data = data
+    # Начала окон не зависят от параметров EMA - считаем один раз на процесс для всей сетки
+    _worker_windows = {
+        (ticker_id, hours): window_first(candles['timestamp_column'].to_numpy(dtype='datetime64[us]'), hours)
+        for ticker_id, (candles, _) in data.items() for hours in windows
+    }
+
+
+def params_key(params: BacktestParams) -> str:
+    return json.dumps(params.model_dump(), sort_keys=True)
+
+
+def data_version(data: BacktestData) -> str:
+    digest = hashlib.sha1()
+    for ticker_id in sorted(data):
+        for frame in data[ticker_id]:
+            digest.update(str(ticker_id).encode())
+            digest.update(str(len(frame)).encode())
+            if len(frame):
+                digest.update(str(frame['timestamp_column'].iloc[-1]).encode())
+                digest.update(str(frame['close'].iloc[-1]).encode())
+    return digest.hexdigest()
+
+
+def window_first(timestamps: np.ndarray, hours: int) -> np.ndarray:
+    # Окно учитывает торговую сессию так же, как при проверке стратегии в реальном времени
+    starts = np.array([get_start_time(timestamp, hours) for timestamp in pd.to_datetime(timestamps).to_pydatetime()],
+                      dtype='datetime64[us]')
+    return np.searchsorted(timestamps, starts, side='left')
+
+
+def cross_counts(crosses: np.ndarray, first: np.ndarray) -> np.ndarray:
+    cumulative = np.concatenate([[0], np.cumsum(crosses)])
+    return cumulative[1:] - cumulative[first]
+
+
+def find_signals(candles: pd.DataFrame, hour_candles: pd.DataFrame, params: BacktestParams,
+                 horizons: list[int], windows: dict[int, np.ndarray]) -> pd.DataFrame:
+    timestamps = candles['timestamp_column'].to_numpy(dtype='datetime64[us]')
+    close, high, low = (candles[column].to_numpy(dtype=float) for column in ('close', 'high', 'low'))
+    ema = candles['close'].ewm(span=params.span, adjust=False).mean().to_numpy()
+    older_ema = candles['close'].ewm(span=params.older_span, adjust=False).mean().to_numpy()
+
+    short = np.zeros(len(candles), dtype=bool)
+    long = np.zeros(len(candles), dtype=bool)
+    short[1:] = (high[1:] >= ema[1:]) & (high[:-1] < ema[:-1])
+    long[1:] = (low[:-1] > ema[:-1]) & (low[1:] <= ema[1:])
+    crosses = short | long
+    window_count = cross_counts(crosses, windows[params.cross_window])
+    hour_count = cross_counts(crosses, windows[1])
+
+    hour_timestamps = hour_candles['timestamp_column'].to_numpy(dtype='datetime64[us]')
+    hour_pos = np.searchsorted(hour_timestamps, timestamps, side='right') - 1
+    hour_open = np.full(len(candles), np.nan)
+    if len(hour_candles):
+        hour_open = np.where(hour_pos >= 0, hour_candles['open'].to_numpy(dtype=float)[np.maximum(hour_pos, 0)], np.nan)
+
+    base = (crosses & (window_count >= params.min_cross) & (window_count <= params.max_cross) & (hour_count == 1)
+            & ~np.isnan(hour_open))
+    short_signal = base & short & (ema < older_ema) & (hour_open < ema)
+    long_signal = base & long & (ema > older_ema) & (hour_open > ema)
+    positions = np.flatnonzero(short_signal | long_signal)
+    direction = np.where(short_signal[positions], -1, 1)
+
+    signals = pd.DataFrame({
+        'timestamp_column': timestamps[positions],
+        'direction': np.where(direction < 0, 'SHORT', 'LONG'),
+        'close': close[positions],
+        'ema': ema[positions],
+        'cross_count': window_count[positions],
+    })
+    for horizon in horizons:
+        forward = positions + horizon
+        valid = forward < len(close)
+        returns = np.full(len(positions), np.nan)
+        returns[valid] = (close[forward[valid]] / close[positions[valid]] - 1) * direction[valid]
+        signals[f'return_{horizon}'] = returns
+    return signals
+
+
+def summarize(signals: pd.DataFrame, horizons: list[int]) -> dict:
+    stats = {'signals': len(signals)}
+    for horizon in horizons:
+        returns = signals[f'return_{horizon}'].dropna() if len(signals) else pd.Series(dtype=float)
+        stats[f'return_{horizon}'] = {
+            'count': len(returns),
+            'mean': float(returns.mean()) if len(returns) else None,
+            'median': float(returns.median()) if len(returns) else None,
+            'win_rate': float((returns > 0).mean()) if len(returns) else None,
+        }
+    return stats
+
+
+def run_backtest(params: BacktestParams, horizons: list[int]) -> dict:
+    frames = []
+    for ticker_id, (candles, hour_candles) in _worker_data.items():
+        windows = {hours: _worker_windows[(ticker_id, hours)] for hours in {params.cross_window, 1}}
+        signals = find_signals(candles, hour_candles, params, horizons, windows)
+        signals.insert(0, 'ticker_id', ticker_id)
+        frames.append(signals)
+    signals = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if len(signals):
+        signals = signals.sort_values('timestamp_column', ignore_index=True)
+        signals['timestamp_column'] = signals['timestamp_column'].astype(str)
+    return {
+        'params': params.model_dump(),
+        'stats': summarize(signals, horizons),
+        'signals': json.loads(signals.to_json(orient='records')) if len(signals) else [],
+    }
+
+
+class Backtester:
+
+    def __init__(self, data: BacktestData, cache_dir: str = backtest_cache_dir, max_workers: int = history_workers,
+                 horizons: Optional[list[int]] = None):
+        self.data = data
+        self.version = data_version(data)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.horizons = horizons or backtest_horizons
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.version}_{'_'.join(map(str, self.horizons))}.json")
+
+    def _load_cache(self) -> dict:
+        path = self._cache_path()
+        if not os.path.exists(path):
+            return {}
+        with open(path) as file:
+            return json.load(file)
+
+    def _save_cache(self, cache: dict) -> None:
+        path = self._cache_path()
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump(cache, file)
+        os.replace(f"{path}.tmp", path)
+
+    def run(self, grid: list[BacktestParams]) -> list[dict]:
+        cache = self._load_cache()
+        missing = [params for params in grid if params_key(params) not in cache]
+        logger.info(f"Бэктест | наборов параметров: {len(grid)}; из кэша: {len(grid) - len(missing)}")
+        if missing:
+            windows = sorted({params.cross_window for params in missing} | {1})
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(self.data, windows)) as executor:
+                for params, result in zip(missing, executor.map(run_backtest, missing,
+                                                                itertools.repeat(self.horizons))):
+                    cache[params_key(params)] = result
+            self._save_cache(cache)
+        return [cache[params_key(params)] for params in grid]
+
+
+def make_grid(spans: list[int], older_spans: list[int], cross_windows: list[int], min_crosses: list[int],
+              max_crosses: list[int]) -> list[BacktestParams]:
+    return [
+        BacktestParams(span=span, older_span=older_span, cross_window=cross_window, min_cross=min_cross,
+                       max_cross=max_cross)
+        for span, older_span, cross_window, min_cross, max_cross
+        in itertools.product(spans, older_spans, cross_windows, min_crosses, max_crosses)
+        if min_cross <= max_cross
+    ]
+
+
+async def load_data(db: BotPostgresRepository, ticker_names: Optional[list[str]] = None) -> BacktestData:
+    data = {}
+    for ticker in await db.get_tickers_with_figi():
+        if ticker_names and ticker.name not in ticker_names:
+            continue
+        data[ticker.ticker_id] = (await db.get_data_for_init_ema(ticker.ticker_id, CandleInterval.min_5.value),
+                                  await db.get_data_for_init_ema(ticker.ticker_id, CandleInterval.hour.value))
+    return data
+
+
+def report(results: list[dict], horizons: list[int]) -> None:
+    header = ''.join(f"{f'доходн. {horizon}':>14}{'доля +':>8}" for horizon in horizons)
+    print(f"{'span':>6}{'старш.':>8}{'окно':>6}{'пересеч.':>10}{'сигналов':>10}{header}")
+    for result in results:
+        params, stats = result['params'], result['stats']
+        row = ''
+        for horizon in horizons:
+            horizon_stats = stats[f'return_{horizon}']
+            mean, win_rate = horizon_stats['mean'], horizon_stats['win_rate']
+            row += f"{'-' if mean is None else f'{mean:.4%}':>14}{'-' if win_rate is None else f'{win_rate:.0%}':>8}"
+        cross_range = f"{params['min_cross']}..{params['max_cross']}"
+        print(f"{params['span']:>6}{params['older_span']:>8}{params['cross_window']:>6}{cross_range:>10}"
+              f"{stats['signals']:>10}{row}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бэктест стратегии отскока от EMA по сохраненным свечам')
+    parser.add_argument('--tickers', nargs='+', help='тикеры, по умолчанию все')
+    parser.add_argument('--spans', type=int, nargs='+', default=[200])
+    parser.add_argument('--older-spans', type=int, nargs='+', default=[1000])
+    parser.add_argument('--cross-windows', type=int, nargs='+', default=[BacktestParams().cross_window])
+    parser.add_argument('--min-cross', type=int, nargs='+', default=[1])
+    parser.add_argument('--max-cross', type=int, nargs='+', default=[2])
+    parser.add_argument('--horizons', type=int, nargs='+', default=backtest_horizons)
+    parser.add_argument('--workers', type=int, default=history_workers)
+    parser.add_argument('--output', help='файл для сохранения сигналов и статистики в JSON')
+    args = parser.parse_args()
+
+    db = BotPostgresRepository(get_sessionmaker())
+    data = asyncio.run(load_data(db, args.tickers))
+    grid = make_grid(args.spans, args.older_spans, args.cross_windows, args.min_cross, args.max_cross)
+    results = Backtester(data, max_workers=args.workers, horizons=args.horizons).run(grid)
+    report(results, args.horizons)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from market_loader.constants import atr_period
+from market_loader.indicator_registry import create_indicator, indicator_registry, run_indicators
+from market_loader.indicators import (batch_atr, batch_ema, calculate_history, continue_ema,
+                                      update_atr_state)
+from market_loader.models import AtrState
+
+default_bars = [1_000, 10_000, 100_000, 1_000_000]
+default_spans = [200, 1000]
+default_tickers = [1, 10, 100]
+max_batch_cells = 10_000_000
+max_registry_bars = 100_000
+ema_tolerance = 1e-9
+atr_tolerance = 1e-9
+
+
+def generate_ohlc(bars: int, seed: int = 0, start_price: float = 100.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, bars)) * close
+    return pd.DataFrame({
+        'timestamp_column': pd.date_range('2020-01-01', periods=bars, freq='5min'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(1, 10_000, bars),
+    })
+
+
+def reference_ema_atr(df: pd.DataFrame, span: int) -> pd.DataFrame:
+    # Исходная реализация на pandas, с которой сверяются оптимизированные варианты
+    df = df.copy()
+    df['ema'] = df['close'].ewm(span=span, adjust=False).mean()
+    df['high_minus_low'] = df['high'] - df['low']
+    df['high_minus_close_prev'] = abs(df['high'] - df['close'].shift(1))
+    df['low_minus_close_prev'] = abs(df['low'] - df['close'].shift(1))
+    df['tr'] = df[['high_minus_low', 'high_minus_close_prev', 'low_minus_close_prev']].max(axis=1)
+    df['atr'] = df['tr'].rolling(window=atr_period).mean()
+    return df
+
+
+def measure(func: Callable[[], object]) -> tuple[float, float, object]:
+    start = perf_counter()
+    result = func()
+    elapsed = perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, result
+
+
+def max_error(actual: np.ndarray, expected: np.ndarray) -> float:
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    if not np.array_equal(np.isnan(actual), np.isnan(expected)):
+        return np.inf
+    mask = ~np.isnan(expected)
+    if not mask.any():
+        return 0.0
+    return float(np.max(np.abs(actual[mask] - expected[mask]) / np.maximum(np.abs(expected[mask]), 1)))
+
+
+def streaming(df: pd.DataFrame, span: int) -> tuple[np.ndarray, np.ndarray]:
+    close = df['close'].to_numpy()
+    ema = np.concatenate([[close[0]], continue_ema(close[1:], span, close[0])])
+    state = AtrState(ticker_id=0, interval='')
+    atr = np.array([update_atr_state(state, None, high, low, close_value, 'sma')
+                    for high, low, close_value in zip(df['high'], df['low'], close)])
+    return ema, atr
+
+
+def batch(frames: list[pd.DataFrame], spans: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    close, high, low = (np.stack([frame[column].to_numpy() for frame in frames]) for column in ('close', 'high', 'low'))
+    tickers = len(frames)
+    ema = batch_ema(close[:, 1:], spans, np.repeat(close[:, :1], len(spans), axis=1))
+    atr, _, _, _ = batch_atr(high, low, close, np.full(tickers, np.nan), np.full((tickers, atr_period), np.nan),
+                             np.full(tickers, np.nan), 'sma')
+    return np.concatenate([np.repeat(close[:, :1, None], len(spans), axis=2), ema], axis=1), atr
+
+
+def registry(df: pd.DataFrame) -> int:
+    indicators = [create_indicator(name) for name in indicator_registry]
+    return len(run_indicators(indicators, {}, df.itertuples(index=False)))
+
+
+def report(name: str, bars: int, tickers: int, elapsed: float, peak: float, error: str = '') -> None:
+    throughput = bars * tickers / elapsed if elapsed else float('inf')
+    print(f"{name:<22}{bars:>10}{tickers:>9}{elapsed:>11.4f}{throughput:>15,.0f}{peak:>11.1f}  {error}")
+
+
+def run(bars_list: list[int], spans: list[int], tickers_list: list[int]) -> bool:
+    print(f"{'вариант':<22}{'свечей':>10}{'тикеров':>9}{'время, с':>11}{'свечей/с':>15}{'пик, МБ':>11}  точность")
+    passed = True
+    for bars in bars_list:
+        df = generate_ohlc(bars)
+        for span in spans:
+            elapsed, peak, expected = measure(lambda: reference_ema_atr(df, span))
+            report(f"pandas span={span}", bars, 1, elapsed, peak)
+
+            elapsed, peak, (emas, atr) = measure(
+                lambda: calculate_history(df['close'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+                                          [span], 'sma'))
+            errors = (max_error(emas[:, 0], expected['ema']), max_error(atr, expected['atr']))
+            passed &= errors[0] <= ema_tolerance and errors[1] <= atr_tolerance
+            report(f"history span={span}", bars, 1, elapsed, peak, f"ema {errors[0]:.1e}; atr {errors[1]:.1e}")
+
+            elapsed, peak, (ema, atr) = measure(lambda: streaming(df, span))
+            errors = (max_error(ema, expected['ema']), max_error(atr, expected['atr']))
+            passed &= errors[0] <= ema_tolerance and errors[1] <= atr_tolerance
+            report(f"streaming span={span}", bars, 1, elapsed, peak, f"ema {errors[0]:.1e}; atr {errors[1]:.1e}")
+
+        for tickers in tickers_list:
+            if bars * tickers > max_batch_cells:
+                continue
+            frames = [generate_ohlc(bars, seed=seed) for seed in range(tickers)]
+            elapsed, peak, (ema, atr) = measure(lambda: batch(frames, spans))
+            expected = [reference_ema_atr(frames[0], span) for span in spans]
+            errors = [max_error(ema[0, :, pos], frame['ema']) for pos, frame in enumerate(expected)]
+            errors.append(max_error(atr[0], expected[0]['atr']))
+            passed &= max(errors[:-1]) <= ema_tolerance and errors[-1] <= atr_tolerance
+            report(f"batch spans={len(spans)}", bars, tickers, elapsed, peak,
+                   f"ema {max(errors[:-1]):.1e}; atr {errors[-1]:.1e}")
+
+        if bars <= max_registry_bars:
+            elapsed, peak, _ = measure(lambda: registry(df))
+            report(f"registry x{len(indicator_registry)}", bars, 1, elapsed, peak)
+    print('Точность в пределах допусков' if passed else 'Расхождение с эталонной реализацией pandas')
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк и проверка точности расчета индикаторов')
+    parser.add_argument('--bars', type=int, nargs='+', default=default_bars)
+    parser.add_argument('--spans', type=int, nargs='+', default=default_spans)
+    parser.add_argument('--tickers', type=int, nargs='+', default=default_tickers)
+    parser.add_argument('--quick', action='store_true', help='только небольшие размеры истории')
+    args = parser.parse_args()
+    bars = [value for value in args.bars if value <= 10_000] if args.quick else args.bars
+    sys.exit(0 if run(bars, args.spans, args.tickers) else 1)
+
+
+if __name__ == "__main__":
+    main()
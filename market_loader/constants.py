@@ -7,4 +7,40 @@ attempts_to_tcs_request = 10
 tcs_request_timeout = 10
 deep_for_hour_candles = 60
 atr_period = 14
+atr_method = 'sma'
+atr_warmup = 100
 mine_circle_sleep_time = 300
+candle_cache_dir = 'data/candles'
+incremental_ema = True
+history_workers = 2
+indicator_write_batch = 5000
+backtest_cache_dir = 'data/backtests'
+backtest_horizons = [1, 6, 12, 48]
+tg_global_rate = 30
+tg_chat_interval = 1
+tg_message_limit = 4096
+tg_max_retry_time = 120
+rebound_timeframes = {
+    'CANDLE_INTERVAL_5_MIN': {'older_interval': 'CANDLE_INTERVAL_5_MIN', 'older_span': 1000,
+                              'candle_interval': 'CANDLE_INTERVAL_HOUR'},
+    'CANDLE_INTERVAL_15_MIN': {'older_interval': 'CANDLE_INTERVAL_HOUR', 'older_span': 200,
+                               'candle_interval': 'CANDLE_INTERVAL_HOUR'},
+    'CANDLE_INTERVAL_HOUR': {'older_interval': 'CANDLE_INTERVAL_DAY', 'older_span': 200,
+                             'candle_interval': 'CANDLE_INTERVAL_DAY'},
+}
+# Стратегии для пользователей без выбранных стратегий и отладочного чата; 15 мин и час подключаются через
+# user_strategies
+default_strategy_keys = [('rebound', 'CANDLE_INTERVAL_5_MIN')]
+market_events_channel = 'market_events'
+evaluation_debounce = 0.5
+evaluation_sweep_interval = 300
+subscribers_rebuild_interval = 300
+events_reconnect_timeout = 10
+latency_stages = ['fetched', 'inserted', 'ema_computed', 'evaluated', 'queued', 'delivered']
+latency_buckets = [0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800]
+latency_max_age = 3600
+latency_export_path = 'data/latency.json'
+status_key = 'ticker_status'
+status_interval = 'CANDLE_INTERVAL_5_MIN'
+status_spans = [200, 1000]
+status_ttl = 3600
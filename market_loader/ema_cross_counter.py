@@ -0,0 +1,52 @@
+import asyncio
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+
+from loguru import logger
+
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+
+
+class EmaCrossCounter:
+
+    def __init__(self, db: BotPostgresRepository):
+        self.db = db
+        self.crosses: dict[tuple[int, str, int], list[datetime]] = defaultdict(list)
+        self.pending: set[asyncio.Task] = set()
+
+    async def load(self, interval: str, span: int, since: datetime) -> None:
+        for key in [key for key in self.crosses if key[1:] == (interval, span)]:
+            del self.crosses[key]
+        for ticker_id, timestamp in await self.db.get_ema_crosses_since(interval, span, since):
+            self.crosses[(ticker_id, interval, span)].append(timestamp)
+        logger.info(f"Загружены пересечения EMA | span: {span}; "
+                    f"записей: {sum(len(timestamps) for timestamps in self.crosses.values())}")
+
+    def add(self, ticker_id: int, interval: str, span: int, timestamp: datetime) -> bool:
+        timestamps = self.crosses[(ticker_id, interval, span)]
+        pos = bisect_left(timestamps, timestamp)
+        if pos < len(timestamps) and timestamps[pos] == timestamp:
+            return False
+        insort(timestamps, timestamp)
+        task = asyncio.create_task(self.db.add_ema_cross(ticker_id, interval, span, timestamp))
+        self.pending.add(task)
+        task.add_done_callback(self._on_saved)
+        return True
+
+    def _on_saved(self, task: asyncio.Task) -> None:
+        self.pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка сохранения пересечения EMA: {task.exception()}")
+
+    def count(self, ticker_id: int, interval: str, span: int, start_time: datetime, end_time: datetime) -> int:
+        timestamps = self.crosses.get((ticker_id, interval, span), [])
+        return bisect_right(timestamps, end_time) - bisect_left(timestamps, start_time)
+
+    def trim(self, before: datetime) -> None:
+        for timestamps in self.crosses.values():
+            del timestamps[:bisect_left(timestamps, before)]
+
+    async def flush(self) -> None:
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import asyncpg
+from loguru import logger
+
+from market_loader.constants import (evaluation_debounce, evaluation_sweep_interval, events_reconnect_timeout,
+                                     latency_export_path, market_events_channel)
+from market_loader.latency import latency_tracker
+from market_loader.models import DirtyRange
+from market_loader.strategy_evaluator import StrategyEvaluator
+
+
+class EvaluationListener:
+
+    def __init__(self, dsn: str, evaluator: StrategyEvaluator, debounce: float = evaluation_debounce,
+                 sweep_interval: float = evaluation_sweep_interval):
+        self.dsn = dsn
+        self.evaluator = evaluator
+        self.debounce = debounce
+        self.sweep_interval = sweep_interval
+        self.pending: dict[tuple[int, str], DirtyRange] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        event = json.loads(payload)
+        # Сигналы зависят от EMA, поэтому проверка запускается после записи индикаторов, а не свечей
+        if event['table'] != 'ema':
+            return
+        key = (event['ticker_id'], event['interval'])
+        timestamp = datetime.fromisoformat(event['timestamp'])
+        dirty_range = self.pending.get(key)
+        if dirty_range is None:
+            self.pending[key] = DirtyRange(start=timestamp, end=timestamp, count=1)
+        else:
+            dirty_range.start = min(dirty_range.start, timestamp)
+            dirty_range.end = max(dirty_range.end, timestamp)
+            dirty_range.count += 1
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        # Уведомления, пришедшие во время проверки, копятся в pending и проверяются следующим проходом,
+        # пока задача не завершилась, новая не создается
+        while True:
+            await asyncio.sleep(self.debounce)
+            async with self.lock:
+                dirty, self.pending = self.pending, {}
+                if not dirty:
+                    return
+                logger.info(f"Проверка по событиям | пар тикер-интервал: {len(dirty)}")
+                await self._check(dirty)
+
+    async def _check(self, dirty: Optional[dict[tuple[int, str], DirtyRange]]) -> None:
+        try:
+            await self.evaluator.check_strategy(dirty)
+            latency_tracker.export(os.getenv("LATENCY_EXPORT_PATH", latency_export_path))
+        except Exception as e:
+            logger.error(f"Ошибка проверки стратегии: {e}")
+
+    async def _sweep(self) -> None:
+        # Полная проверка на случай потерянных уведомлений; повторно свечи не проверяются благодаря контрольной точке
+        while True:
+            async with self.lock:
+                await self._check(None)
+            await asyncio.sleep(self.sweep_interval)
+
+    async def run(self) -> None:
+        sweep = asyncio.create_task(self._sweep())
+        try:
+            while True:
+                try:
+                    connection = await asyncpg.connect(self.dsn)
+                    await connection.add_listener(market_events_channel, self._on_notification)
+                    logger.info("Подписались на события рынка")
+                    while not connection.is_closed():
+                        await asyncio.sleep(1)
+                    logger.error("Соединение для событий рынка закрыто, переподключение")
+                except (OSError, asyncpg.PostgresError) as e:
+                    logger.error(f"Ошибка подписки на события рынка: {e}")
+                await asyncio.sleep(events_reconnect_timeout)
+        finally:
+            sweep.cancel()
@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from time import monotonic
+from typing import Callable, Optional
+
+from loguru import logger
+
+from market_loader.constants import history_workers
+from market_loader.indicators import calculate_history
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import Ema
+from market_loader.utils import get_interval_form_str
+
+
+class HistoryRebuilder:
+
+    def __init__(self, db: BotPostgresRepository, max_workers: int = history_workers):
+        self.db = db
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.tasks: dict[tuple[int, str], asyncio.Task] = {}
+        self.submitted = 0
+        self.finished = 0
+
+    def is_busy(self, ticker_id: int, interval: str) -> bool:
+        task = self.tasks.get((ticker_id, interval))
+        return task is not None and not task.done()
+
+    def submit(self, ticker_id: int, name: str, interval: str, spans: list[int], full_history: bool = False,
+               overwrite_from: Optional[datetime] = None) -> bool:
+        if self.is_busy(ticker_id, interval):
+            return False
+        self.submitted += 1
+        task = asyncio.create_task(self.rebuild(ticker_id, name, interval, spans, full_history, overwrite_from))
+        task.add_done_callback(self._on_done)
+        self.tasks[(ticker_id, interval)] = task
+        return True
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.finished += 1
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка пересчета истории: {task.exception()}")
+        logger.info(f"Пересчет истории | выполнено: {self.finished} из {self.submitted}")
+
+    async def run_in_pool(self, func: Callable, *args):
+        if self.executor is None:
+            # Процессы запускаются только при первом пересчете и останавливаются в shutdown
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def rebuild(self, ticker_id: int, name: str, interval: str, spans: list[int],
+                      full_history: bool = False, overwrite_from: Optional[datetime] = None) -> None:
+        start_time = monotonic()
+        if full_history or overwrite_from is not None:
+            df = await self.db.get_data_for_init_ema(ticker_id, interval)
+        else:
+            df = await self.db.get_data_for_ema(ticker_id, interval, max(spans))
+        emas, atr = await self.run_in_pool(
+            calculate_history,
+            df['close'].to_numpy(dtype=float), df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float),
+            spans
+        )
+
+        last_emas = await self.db.get_latest_emas(interval, spans, [ticker_id])
+        timestamps = df['timestamp_column']
+        rows = []
+        for pos, span in enumerate(spans):
+            last_ema = last_emas.get((ticker_id, span))
+            if overwrite_from is not None:
+                # Дозагрузка в рассчитанную историю: перезаписываем все значения начиная с нее
+                start = timestamps.searchsorted(overwrite_from, side='left')
+            else:
+                start = 0 if last_ema is None else timestamps.searchsorted(last_ema.timestamp_column, side='right')
+            rows.extend(
+                Ema(ticker_id=ticker_id, interval=interval, span=span, timestamp_column=timestamp, ema=ema,
+                    atr=atr_value)
+                for timestamp, ema, atr_value in zip(timestamps[start:], emas[start:, pos], atr[start:])
+            )
+        await self.db.bulk_upsert_ema(rows)
+        logger.info((f"Пересчитана история EMA | тикер: {name}; интервал: {get_interval_form_str(interval)}; "
+                     f"span: {spans}; свечей: {len(df)}; время: {monotonic() - start_time:.1f} с"))
+
+    def shutdown(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,81 @@
+import numpy as np
+from loguru import logger
+
+from market_loader.constants import atr_period
+from market_loader.indicators import batch_atr, batch_ema
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import AtrState, Ema, Ticker
+from market_loader.utils import get_interval_form_str
+
+
+class BatchIndicatorEngine:
+
+    def __init__(self, db: BotPostgresRepository):
+        self.db = db
+
+    async def run(self, interval: str, spans: list[int], tickers: list[Ticker],
+                  atr_states: dict[tuple[int, str], AtrState]) -> set[int]:
+        ticker_ids = [ticker.ticker_id for ticker in tickers]
+        last_emas = await self.db.get_latest_emas(interval, spans, ticker_ids)
+        since = {}
+        for ticker_id in ticker_ids:
+            emas = [last_emas.get((ticker_id, span)) for span in spans]
+            state = atr_states.get((ticker_id, interval))
+            if state is None or any(ema is None or ema.timestamp_column != state.timestamp_column for ema in emas):
+                continue
+            since[ticker_id] = state.timestamp_column
+        if not since:
+            return set()
+
+        candles = await self.db.get_candles_since(interval, since)
+        batch_ids, frames = [], []
+        for ticker_id, group in candles.groupby('ticker_id', sort=False):
+            # Первая свеча должна совпадать с последней рассчитанной, иначе в истории пропуск
+            if group['timestamp_column'].iloc[0] == since[ticker_id]:
+                batch_ids.append(ticker_id)
+                frames.append(group.iloc[1:])
+        width = max((len(frame) for frame in frames), default=0)
+        if width == 0:
+            return set(batch_ids)
+
+        close, high, low = (np.full((len(frames), width), np.nan) for _ in range(3))
+        for pos, frame in enumerate(frames):
+            close[pos, :len(frame)] = frame['close']
+            high[pos, :len(frame)] = frame['high']
+            low[pos, :len(frame)] = frame['low']
+
+        states = [atr_states[(ticker_id, interval)] for ticker_id in batch_ids]
+        last_ema = np.array([[last_emas[(ticker_id, span)].ema for span in spans] for ticker_id in batch_ids])
+        tr_window = np.full((len(states), atr_period), np.nan)
+        for pos, state in enumerate(states):
+            if state.tr_window:
+                tr_window[pos, -len(state.tr_window):] = state.tr_window
+
+        ema = batch_ema(close, spans, last_ema)
+        atr, last_close, tr_window, last_atr = batch_atr(
+            high, low, close,
+            np.array([state.last_close for state in states]),
+            tr_window,
+            np.array([np.nan if state.atr is None else state.atr for state in states])
+        )
+
+        rows = []
+        for pos, (ticker_id, frame) in enumerate(zip(batch_ids, frames)):
+            if not len(frame):
+                continue
+            timestamps = frame['timestamp_column'].tolist()
+            for bar, timestamp in enumerate(timestamps):
+                for span_pos, span in enumerate(spans):
+                    rows.append(Ema(ticker_id=ticker_id, interval=interval, span=span, timestamp_column=timestamp,
+                                    ema=ema[pos, bar, span_pos], atr=atr[pos, bar]))
+            state = states[pos]
+            state.timestamp_column = timestamps[-1].to_pydatetime()
+            state.last_close = float(last_close[pos])
+            state.tr_window = [float(value) for value in tr_window[pos] if not np.isnan(value)]
+            state.atr = None if np.isnan(last_atr[pos]) else float(last_atr[pos])
+
+        await self.db.bulk_upsert_ema(rows)
+        await self.db.save_atr_states([state for state, frame in zip(states, frames) if len(frame)])
+        logger.info(f"Пакетный расчет | интервал: {get_interval_form_str(interval)}; тикеров: {len(batch_ids)}; "
+                    f"записей: {len(rows)}")
+        return set(batch_ids)
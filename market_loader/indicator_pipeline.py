@@ -0,0 +1,93 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+from loguru import logger
+
+from market_loader.constants import indicator_write_batch
+from market_loader.history_rebuilder import HistoryRebuilder
+from market_loader.indicator_registry import (create_indicator, Indicator, indicator_registry, run_indicators,
+                                              run_indicators_history)
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import IndicatorState, IndicatorValue, Ticker
+from market_loader.utils import get_interval_form_str
+
+
+class IndicatorPipeline:
+
+    def __init__(self, db: BotPostgresRepository, rebuilder: HistoryRebuilder):
+        self.db = db
+        self.rebuilder = rebuilder
+
+    async def run(self, tickers_by_interval: dict[str, list[Ticker]]) -> None:
+        indicators_by_interval = defaultdict(list)
+        for config in await self.db.get_indicators_to_calc():
+            if config.name not in indicator_registry:
+                logger.error(f"Неизвестный индикатор: {config.name}")
+                continue
+            indicators_by_interval[config.interval].append(create_indicator(config.name, config.params))
+        for interval, indicators in indicators_by_interval.items():
+            if tickers_by_interval.get(interval):
+                await self._run_interval(interval, indicators, tickers_by_interval[interval])
+
+    async def _run_interval(self, interval: str, indicators: list[Indicator], tickers: list[Ticker]) -> None:
+        keys = sorted(indicator.key for indicator in indicators)
+        states = await self.db.get_indicator_states(interval)
+        since = {}
+        for ticker in tickers:
+            state = states.get(ticker.ticker_id)
+            if state is None or sorted(state.state.get('indicators', {})) != keys:
+                # Набор индикаторов изменился - считаем все заново с начала истории
+                states[ticker.ticker_id] = IndicatorState(ticker_id=ticker.ticker_id, interval=interval)
+                since[ticker.ticker_id] = datetime.min
+            else:
+                since[ticker.ticker_id] = state.timestamp_column
+        if not since:
+            return
+
+        candles = await self.db.get_candles_since(interval, since)
+        values, changed_states, cold_starts, written = [], [], [], 0
+        for ticker_id, group in candles.groupby('ticker_id', sort=False):
+            state = states[ticker_id]
+            bars = group[group['timestamp_column'] > state.timestamp_column] if state.timestamp_column else group
+            if not len(bars):
+                continue
+            if state.timestamp_column is None:
+                # Вся история считается в пуле процессов, чтобы не блокировать цикл событий
+                cold_starts.append(self._run_history(indicators, state, bars))
+                continue
+            values.extend(self._to_values(interval, ticker_id,
+                                          run_indicators(indicators, state.state, bars.itertuples(index=False))))
+            state.timestamp_column = bars['timestamp_column'].iloc[-1].to_pydatetime()
+            changed_states.append(state)
+        for cold_start in asyncio.as_completed(cold_starts):
+            state, results = await cold_start
+            values.extend(self._to_values(interval, state.ticker_id, results))
+            changed_states.append(state)
+            if len(values) >= indicator_write_batch:
+                written += await self._write(values)
+        written += await self._write(values)
+        await self.db.save_indicator_states(changed_states)
+        logger.info(f"Индикаторы | интервал: {get_interval_form_str(interval)}; {keys}; записей: {written}")
+
+    async def _run_history(self, indicators: list[Indicator], state: IndicatorState,
+                           bars: pd.DataFrame) -> tuple[IndicatorState, list[tuple]]:
+        results, state.state = await self.rebuilder.run_in_pool(run_indicators_history, indicators, state.state,
+                                                                bars)
+        state.timestamp_column = bars['timestamp_column'].iloc[-1].to_pydatetime()
+        return state, results
+
+    @staticmethod
+    def _to_values(interval: str, ticker_id: int, results: list[tuple]) -> list[IndicatorValue]:
+        return [IndicatorValue(ticker_id=ticker_id, interval=interval, indicator=key, timestamp_column=timestamp,
+                               values=indicator_values)
+                for key, timestamp, indicator_values in results]
+
+    async def _write(self, values: list[IndicatorValue]) -> int:
+        # Пишем пачками, чтобы история не уходила в базу одним огромным запросом
+        count = len(values)
+        for start in range(0, count, indicator_write_batch):
+            await self.db.bulk_upsert_indicator_values(values[start:start + indicator_write_batch])
+        values.clear()
+        return count
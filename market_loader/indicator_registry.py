@@ -0,0 +1,173 @@
+import inspect
+import math
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from market_loader.constants import atr_period
+
+indicator_registry: dict[str, type['Indicator']] = {}
+
+
+def register_indicator(name: str):
+    def decorator(cls: type['Indicator']) -> type['Indicator']:
+        if inspect.isabstract(cls):
+            raise TypeError(f"Индикатор {name} не реализует {', '.join(sorted(cls.__abstractmethods__))}")
+        cls.name = name
+        indicator_registry[name] = cls
+        return cls
+    return decorator
+
+
+def create_indicator(name: str, params: Optional[dict] = None) -> 'Indicator':
+    return indicator_registry[name](**(params or {}))
+
+
+def _ema_step(previous: Optional[float], value: float, span: int) -> float:
+    if previous is None:
+        return value
+    alpha = 2 / (span + 1)
+    return alpha * value + (1 - alpha) * previous
+
+
+def _clean(value: Optional[float]) -> Optional[float]:
+    return None if value is None or math.isnan(value) else value
+
+
+class Indicator(ABC):
+    name = ''
+    defaults: dict = {}
+
+    def __init__(self, **params):
+        self.params = {**self.defaults, **params}
+
+    @property
+    def key(self) -> str:
+        return '_'.join([self.name] + [str(value) for value in self.params.values()])
+
+    @abstractmethod
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        ...
+
+
+@register_indicator('ema')
+class EmaIndicator(Indicator):
+    defaults = {'span': 200}
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        state['ema'] = _ema_step(state.get('ema'), bar.close, self.params['span'])
+        return {'ema': state['ema']}
+
+
+@register_indicator('atr')
+class AtrIndicator(Indicator):
+    defaults = {'period': atr_period}
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        period = self.params['period']
+        state['window'] = (state.get('window', []) + [shared['tr']])[-period:]
+        atr = sum(state['window']) / period if len(state['window']) == period else None
+        return {'atr': atr}
+
+
+@register_indicator('rsi')
+class RsiIndicator(Indicator):
+    defaults = {'period': 14}
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        period = self.params['period']
+        if shared['prev_close'] is None:
+            return {'rsi': None}
+        change = bar.close - shared['prev_close']
+        gain, loss = max(change, 0), max(-change, 0)
+        count = state.get('count', 0) + 1
+        state['count'] = count
+        if count <= period:
+            # Первые period изменений копят простую среднюю, дальше - сглаживание Уайлдера
+            state['avg_gain'] = state.get('avg_gain', 0) + gain / period
+            state['avg_loss'] = state.get('avg_loss', 0) + loss / period
+            if count < period:
+                return {'rsi': None}
+        else:
+            state['avg_gain'] = (state['avg_gain'] * (period - 1) + gain) / period
+            state['avg_loss'] = (state['avg_loss'] * (period - 1) + loss) / period
+        if state['avg_loss'] == 0:
+            return {'rsi': 100.0}
+        return {'rsi': 100 - 100 / (1 + state['avg_gain'] / state['avg_loss'])}
+
+
+@register_indicator('macd')
+class MacdIndicator(Indicator):
+    defaults = {'fast': 12, 'slow': 26, 'signal': 9}
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        state['fast'] = _ema_step(state.get('fast'), bar.close, self.params['fast'])
+        state['slow'] = _ema_step(state.get('slow'), bar.close, self.params['slow'])
+        macd = state['fast'] - state['slow']
+        state['signal'] = _ema_step(state.get('signal'), macd, self.params['signal'])
+        return {'macd': macd, 'signal': state['signal'], 'histogram': macd - state['signal']}
+
+
+@register_indicator('bollinger')
+class BollingerIndicator(Indicator):
+    defaults = {'period': 20, 'width': 2}
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        period = self.params['period']
+        state['window'] = (state.get('window', []) + [bar.close])[-period:]
+        if len(state['window']) < period:
+            return {'middle': None, 'upper': None, 'lower': None}
+        middle = sum(state['window']) / period
+        deviation = math.sqrt(sum((value - middle) ** 2 for value in state['window']) / period)
+        return {'middle': middle,
+                'upper': middle + self.params['width'] * deviation,
+                'lower': middle - self.params['width'] * deviation}
+
+
+@register_indicator('vwap')
+class VwapIndicator(Indicator):
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        day = bar.timestamp_column.date().isoformat()
+        if state.get('day') != day:
+            state.update(day=day, price_volume=0.0, volume=0)
+        state['price_volume'] += shared['typical_price'] * bar.volume
+        state['volume'] += int(bar.volume)
+        return {'vwap': state['price_volume'] / state['volume'] if state['volume'] else None}
+
+
+@register_indicator('keltner')
+class KeltnerIndicator(Indicator):
+    defaults = {'span': 20, 'atr_period': 10, 'multiplier': 2}
+
+    def update(self, state: dict, bar, shared: dict) -> dict[str, Optional[float]]:
+        state['ema'] = _ema_step(state.get('ema'), bar.close, self.params['span'])
+        state['atr'] = _ema_step(state.get('atr'), shared['tr'], self.params['atr_period'])
+        offset = self.params['multiplier'] * state['atr']
+        return {'middle': state['ema'], 'upper': state['ema'] + offset, 'lower': state['ema'] - offset}
+
+
+def update_shared(shared: dict, bar) -> None:
+    tr = bar.high - bar.low
+    if shared.get('prev_close') is not None:
+        tr = max(tr, abs(bar.high - shared['prev_close']), abs(bar.low - shared['prev_close']))
+    shared['tr'] = tr
+    shared['typical_price'] = (bar.high + bar.low + bar.close) / 3
+
+
+def run_indicators(indicators: list[Indicator], state: dict, bars) -> list[tuple]:
+    shared = state.setdefault('shared', {'prev_close': None})
+    indicator_states = state.setdefault('indicators', {})
+    results = []
+    for bar in bars:
+        update_shared(shared, bar)
+        for indicator in indicators:
+            values = indicator.update(indicator_states.setdefault(indicator.key, {}), bar, shared)
+            results.append((indicator.key, bar.timestamp_column,
+                            {name: _clean(value) for name, value in values.items()}))
+        shared['prev_close'] = bar.close
+    return results
+
+
+def run_indicators_history(indicators: list[Indicator], state: dict, bars) -> tuple[list[tuple], dict]:
+    # Для пула процессов: состояние меняется в дочернем процессе, поэтому возвращается вместе с результатом
+    return run_indicators(indicators, state, bars.itertuples(index=False)), state
@@ -0,0 +1,93 @@
+import math
+from datetime import datetime
+
+import numpy as np
+from pandas import DataFrame
+
+from market_loader.constants import atr_method, atr_period
+from market_loader.models import AtrState
+
+
+def ema_alpha(span: int) -> float:
+    return 2 / (span + 1)
+
+
+def continue_ema(close: np.ndarray, span: int, last_ema: float) -> np.ndarray:
+    alpha = ema_alpha(span)
+    result = np.empty(len(close))
+    ema = last_ema
+    for pos, value in enumerate(close):
+        ema = alpha * value + (1 - alpha) * ema
+        result[pos] = ema
+    return result
+
+
+def add_atr(df: DataFrame, method: str = atr_method) -> DataFrame:
+    df['high_minus_low'] = df['high'] - df['low']
+    df['high_minus_close_prev'] = abs(df['high'] - df['close'].shift(1))
+    df['low_minus_close_prev'] = abs(df['low'] - df['close'].shift(1))
+    df['tr'] = df[['high_minus_low', 'high_minus_close_prev', 'low_minus_close_prev']].max(axis=1)
+    df['atr'] = df['tr'].rolling(window=atr_period).mean()
+    if method == 'wilder' and len(df) > atr_period:
+        # Сглаживание Уайлдера стартует со средней первых atr_period значений TR
+        seeded = df['tr'].iloc[atr_period - 1:].copy()
+        seeded.iloc[0] = df['atr'].iloc[atr_period - 1]
+        df.loc[seeded.index, 'atr'] = seeded.ewm(alpha=1 / atr_period, adjust=False).mean()
+    return df
+
+
+def update_atr_state(state: AtrState, timestamp: datetime, high: float, low: float, close: float,
+                     method: str = atr_method) -> float:
+    tr = high - low
+    if state.last_close is not None:
+        tr = max(tr, abs(high - state.last_close), abs(low - state.last_close))
+    state.tr_window = (state.tr_window + [tr])[-atr_period:]
+    if method == 'wilder' and state.atr is not None:
+        state.atr = (state.atr * (atr_period - 1) + tr) / atr_period
+    elif len(state.tr_window) == atr_period:
+        state.atr = sum(state.tr_window) / atr_period
+    state.last_close = close
+    state.timestamp_column = timestamp
+    return state.atr if state.atr is not None else math.nan
+
+
+def batch_ema(close: np.ndarray, spans: list[int], last_ema: np.ndarray) -> np.ndarray:
+    alpha = np.array([ema_alpha(span) for span in spans])
+    ema = last_ema.astype(float)
+    result = np.full(close.shape + (len(spans),), np.nan)
+    for pos in range(close.shape[1]):
+        value = close[:, pos, None]
+        valid = ~np.isnan(value)
+        ema = np.where(valid, alpha * value + (1 - alpha) * ema, ema)
+        result[:, pos] = np.where(valid, ema, np.nan)
+    return result
+
+
+def batch_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, last_close: np.ndarray, tr_window: np.ndarray,
+              atr: np.ndarray, method: str = atr_method) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    last_close = last_close.astype(float)
+    tr_window = tr_window.astype(float)
+    atr = atr.astype(float)
+    result = np.full(close.shape, np.nan)
+    for pos in range(close.shape[1]):
+        valid = ~np.isnan(close[:, pos])
+        tr = np.fmax(high[:, pos] - low[:, pos],
+                     np.fmax(abs(high[:, pos] - last_close), abs(low[:, pos] - last_close)))
+        tr_window = np.where(valid[:, None], np.concatenate([tr_window[:, 1:], tr[:, None]], axis=1), tr_window)
+        new_atr = tr_window.mean(axis=1)
+        if method == 'wilder':
+            new_atr = np.where(np.isnan(atr), new_atr, (atr * (atr_period - 1) + tr) / atr_period)
+        atr = np.where(valid, new_atr, atr)
+        last_close = np.where(valid, close[:, pos], last_close)
+        result[:, pos] = np.where(valid, atr, np.nan)
+    return result, last_close, tr_window, atr
+
+
+def calculate_history(close: np.ndarray, high: np.ndarray, low: np.ndarray, spans: list[int],
+                      method: str = atr_method) -> tuple[np.ndarray, np.ndarray]:
+    df = DataFrame({'close': close, 'high': high, 'low': low})
+    add_atr(df, method)
+    emas = np.empty((len(df), len(spans)))
+    for pos, span in enumerate(spans):
+        emas[:, pos] = df['close'].ewm(span=span, adjust=False).mean().to_numpy()
+    return emas, df['atr'].to_numpy()
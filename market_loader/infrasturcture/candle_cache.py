@@ -0,0 +1,84 @@
+import os
+from typing import Optional
+
+import numpy as np
+from pandas import DataFrame
+
+from market_loader.models import Candle
+
+candle_dtype = np.dtype([
+    ('timestamp_column', 'datetime64[us]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'i8'),
+])
+candle_cache_version = 2
+
+
+class CandleCache:
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, ticker_id: int, interval: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker_id}_{interval}.v{candle_cache_version}.bin")
+
+    def read(self, ticker_id: int, interval: str, limit: Optional[int] = None) -> Optional[np.ndarray]:
+        path = self._path(ticker_id, interval)
+        if not os.path.exists(path):
+            return None
+        size = os.path.getsize(path)
+        if size % candle_dtype.itemsize:
+            self.invalidate(ticker_id, interval)
+            return None
+        if size == 0:
+            return np.empty(0, dtype=candle_dtype)
+        records = np.memmap(path, dtype=candle_dtype, mode='r')
+        return records[-limit:] if limit else records
+
+    def write(self, ticker_id: int, interval: str, records: np.ndarray) -> None:
+        path = self._path(ticker_id, interval)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(records.astype(candle_dtype, copy=False).tobytes())
+        os.replace(tmp_path, path)
+
+    def append(self, ticker_id: int, interval: str, candle: Candle) -> None:
+        records = self.read(ticker_id, interval, limit=1)
+        if records is None:
+            return
+        if len(records) and np.datetime64(candle.timestamp_column, 'us') <= records['timestamp_column'][-1]:
+            # Свеча старше последней в кэше - это дозагрузка пропуска, порядок нарушен
+            self.invalidate(ticker_id, interval)
+            return
+        record = candles_to_records([candle])
+        with open(self._path(ticker_id, interval), 'ab') as file:
+            file.write(record.tobytes())
+
+    def invalidate(self, ticker_id: int, interval: str) -> None:
+        path = self._path(ticker_id, interval)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def candles_to_records(candles: list) -> np.ndarray:
+    return np.array(
+        [(candle.timestamp_column, float(candle.open), float(candle.high), float(candle.low), float(candle.close),
+          candle.volume or 0)
+         for candle in candles],
+        dtype=candle_dtype
+    )
+
+
+def records_to_data_frame(records: np.ndarray) -> DataFrame:
+    return DataFrame({
+        'timestamp_column': records['timestamp_column'],
+        'close': records['close'],
+        'open': records['open'],
+        'high': records['high'],
+        'low': records['low'],
+        'volume': records['volume'],
+    })
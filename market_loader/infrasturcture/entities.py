@@ -1,8 +1,9 @@
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import (BIGINT, Boolean, Column, ForeignKey, Integer, Numeric, String, Text, TIMESTAMP,
+from sqlalchemy import (BIGINT, Boolean, Column, Float, ForeignKey, Integer, Numeric, String, Text, TIMESTAMP,
                         UniqueConstraint)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -98,10 +99,12 @@ class TickerModel(Base):
 
 class UserTickerModel(Base):
     __tablename__ = 'user_tickers'
+    __table_args__ = (UniqueConstraint('user_id', 'ticker_id', name='unique_user_ticker'),)
 
     user_ticker_id = Column(BIGINT, primary_key=True, autoincrement=True)
     user_id = Column(BIGINT, ForeignKey('users.user_id'), nullable=False)
     ticker_id = Column(BIGINT, ForeignKey('tickers.ticker_id'), nullable=False)
+    direction = Column(String(16), nullable=True)
 
     user = relationship('UserModel', back_populates='user_tickers')
     ticker = relationship('TickerModel', back_populates='user_tickers')
@@ -118,6 +121,7 @@ class CandleModel(Base):
     high = Column(Numeric(10, 3), nullable=False)
     low = Column(Numeric(10, 3), nullable=False)
     close = Column(Numeric(10, 3), nullable=False)
+    volume = Column(BIGINT, nullable=True)
 
     __table_args__ = (UniqueConstraint('ticker_id', 'interval', 'timestamp_column', name='unique_candle'),)
 
@@ -160,3 +164,79 @@ class EMACrossModel(Base):
         'ticker_id', 'interval', 'span', 'timestamp_column', name='unique_ema_cross_combination'),)
 
     ticker = relationship('TickerModel', back_populates='ema_cross')
+
+
+class ATRStateModel(Base):
+    __tablename__ = 'atr_state'
+
+    atr_state_id = Column(BIGINT, primary_key=True, autoincrement=True)
+    ticker_id = Column(BIGINT, ForeignKey('tickers.ticker_id'), nullable=False)
+    interval = Column(String(64), nullable=False)
+    timestamp_column = Column(TIMESTAMP, nullable=False)
+    last_close = Column(Float, nullable=False)
+    tr_window = Column(ARRAY(Float), nullable=False)
+    atr = Column(Float, nullable=True)
+
+    __table_args__ = (UniqueConstraint('ticker_id', 'interval', name='unique_atr_state'),)
+
+
+class IndicatorToCalcModel(Base):
+    __tablename__ = 'indicators_to_calc'
+
+    indicator_to_calc_id = Column(BIGINT, primary_key=True, autoincrement=True)
+    interval = Column(String(64), nullable=False)
+    name = Column(String(64), nullable=False)
+    params = Column(JSONB, nullable=False, default=dict)
+
+
+class IndicatorValueModel(Base):
+    __tablename__ = 'indicator_values'
+
+    indicator_value_id = Column(BIGINT, primary_key=True, autoincrement=True)
+    ticker_id = Column(BIGINT, ForeignKey('tickers.ticker_id'), nullable=False)
+    interval = Column(String(64), nullable=False)
+    indicator = Column(String(128), nullable=False)
+    timestamp_column = Column(TIMESTAMP, nullable=False)
+    values = Column(JSONB, nullable=False)
+
+    __table_args__ = (UniqueConstraint('ticker_id', 'interval', 'indicator', 'timestamp_column',
+                                       name='unique_indicator_value'),)
+
+
+class IndicatorStateModel(Base):
+    __tablename__ = 'indicator_state'
+
+    indicator_state_id = Column(BIGINT, primary_key=True, autoincrement=True)
+    ticker_id = Column(BIGINT, ForeignKey('tickers.ticker_id'), nullable=False)
+    interval = Column(String(64), nullable=False)
+    timestamp_column = Column(TIMESTAMP, nullable=False)
+    state = Column(JSONB, nullable=False)
+
+    __table_args__ = (UniqueConstraint('ticker_id', 'interval', name='unique_indicator_state'),)
+
+
+class EvaluatorCheckpointModel(Base):
+    __tablename__ = 'evaluator_checkpoint'
+
+    evaluator_checkpoint_id = Column(BIGINT, primary_key=True, autoincrement=True)
+    strategy = Column(String(64), nullable=False)
+    interval = Column(String(64), nullable=False)
+    ticker_id = Column(BIGINT, ForeignKey('tickers.ticker_id'), nullable=False)
+    timestamp_column = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (UniqueConstraint('strategy', 'interval', 'ticker_id', name='unique_evaluator_checkpoint'),)
+
+
+class SignalLatencyModel(Base):
+    __tablename__ = 'signal_latency'
+
+    signal_latency_id = Column(BIGINT, primary_key=True, autoincrement=True)
+    ticker_id = Column(BIGINT, ForeignKey('tickers.ticker_id'), nullable=False)
+    interval = Column(String(64), nullable=False)
+    timestamp_column = Column(TIMESTAMP, nullable=False)
+    fetched_at = Column(TIMESTAMP, nullable=True)
+    inserted_at = Column(TIMESTAMP, nullable=True)
+    ema_computed_at = Column(TIMESTAMP, nullable=True)
+    evaluated_at = Column(TIMESTAMP, nullable=True)
+    queued_at = Column(TIMESTAMP, nullable=True)
+    delivered_at = Column(TIMESTAMP, nullable=True)
@@ -2,22 +2,30 @@ from datetime import datetime
 from datetime import timedelta, timezone
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import exists, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from market_loader.infrasturcture.entities import (CandleModel, EMACrossModel, EMAModel, EMAToCalcModel, StrategyModel,
+from market_loader.infrasturcture.candle_cache import CandleCache, candles_to_records, records_to_data_frame
+from market_loader.infrasturcture.entities import (ATRStateModel, CandleModel, EMACrossModel, EMAModel, EMAToCalcModel,
+                                                   EvaluatorCheckpointModel, SignalLatencyModel,
+                                                   IndicatorStateModel, IndicatorToCalcModel, IndicatorValueModel,
+                                                   StrategyModel,
                                                    TickerModel,
                                                    TimeframeModel, UserModel,
                                                    UserStrategyModel, UserTickerModel)
-from market_loader.models import Candle, CandleInterval, Ema, EmaToCalc, Ticker, TickerToUpdateEma
-from market_loader.utils import transform_candle_result
+from market_loader.models import (ActiveStrategy, AtrState, Candle, CandleInterval, Ema, EmaToCalc, EvaluatorCheckpoint,
+                                  IndicatorState, IndicatorToCalc, IndicatorValue, SignalLatency, Ticker,
+                                  TickerToUpdateEma, UserTicker)
 
 
 class BotPostgresRepository:
-    def __init__(self, sessionmaker: async_sessionmaker[AsyncSession]):
+    def __init__(self, sessionmaker: async_sessionmaker[AsyncSession], candle_cache: Optional[CandleCache] = None):
         self.sessionmaker = sessionmaker
+        self.candle_cache = candle_cache
 
     async def add_user(self, user_id: int, name: str, lang: str) -> None:
         async with self.sessionmaker() as session:
@@ -89,12 +97,23 @@ class BotPostgresRepository:
             )
             return result.scalar_one_or_none()
 
-    async def add_user_ticker(self, user_id: int, ticker_id: int) -> None:
+    async def add_user_ticker(self, user_id: int, ticker_id: int, direction: Optional[str] = None) -> None:
         async with self.sessionmaker() as session:
-            new_user_ticker = UserTickerModel(user_id=user_id, ticker_id=ticker_id)
+            new_user_ticker = UserTickerModel(user_id=user_id, ticker_id=ticker_id, direction=direction)
             session.add(new_user_ticker)
             await session.commit()
 
+    async def get_user_tickers_since(self, user_ticker_id: int) -> list[UserTicker]:
+        async with self.sessionmaker() as session:
+            result = await session.execute(
+                select(UserTickerModel).
+                join(UserModel, UserModel.user_id == UserTickerModel.user_id).
+                where(UserTickerModel.user_ticker_id > user_ticker_id, UserModel.disable.isnot(True)).
+                order_by(UserTickerModel.user_ticker_id)
+            )
+            return [UserTicker(user_ticker_id=row.user_ticker_id, user_id=row.user_id, ticker_id=row.ticker_id,
+                               direction=row.direction) for row in result.scalars()]
+
     async def get_tickers_without_figi(self) -> list[Ticker]:
         async with self.sessionmaker() as session:
             result = await session.execute(
@@ -137,7 +156,7 @@ class BotPostgresRepository:
                 return None
 
     async def add_candle(self, ticker_id: int, interval: str, timestamp: datetime, open: float, high: float,
-                         low: float, close: float) -> None:
+                         low: float, close: float, volume: int = 0) -> bool:
         async with self.sessionmaker() as session:
             try:
                 new_candle = CandleModel(
@@ -147,12 +166,18 @@ class BotPostgresRepository:
                     open=open,
                     high=high,
                     low=low,
-                    close=close
+                    close=close,
+                    volume=volume
                 )
                 session.add(new_candle)
                 await session.commit()
             except IntegrityError:
                 await session.rollback()
+                return False
+        if self.candle_cache is not None:
+            self.candle_cache.append(ticker_id, interval, Candle(timestamp_column=timestamp, open=open, high=high,
+                                                                 low=low, close=close, volume=volume))
+        return True
 
     async def get_ema_params_to_calc(self) -> list[EmaToCalc]:
         async with self.sessionmaker() as session:
@@ -161,25 +186,31 @@ class BotPostgresRepository:
             )
             return [EmaToCalc(interval=row.interval, span=row.span) for row in result.scalars()]
 
-    async def get_data_for_init_ema(self, ticker_id: int, interval: str) -> pd.DataFrame:
+    async def _query_candle_records(self, ticker_id: int, interval: str, limit: Optional[int] = None) -> np.ndarray:
         async with self.sessionmaker() as session:
-            result = await session.execute(
-                select(CandleModel).
+            query = (
+                select(CandleModel.timestamp_column, CandleModel.open, CandleModel.high, CandleModel.low,
+                       CandleModel.close, CandleModel.volume).
                 where(CandleModel.ticker_id == ticker_id, CandleModel.interval == interval).
-                order_by(CandleModel.timestamp_column)
+                order_by(CandleModel.timestamp_column.desc())
             )
-            candles = result.scalars().all()
-            candles_data = [
-                {
-                    'timestamp_column': candle.timestamp_column,
-                    'close': candle.close,
-                    'open': candle.open,
-                    'high': candle.high,
-                    'low': candle.low
-                }
-                for candle in candles
-            ]
-            return pd.DataFrame(candles_data)
+            if limit:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            return candles_to_records(result.all())[::-1]
+
+    async def _get_candle_records(self, ticker_id: int, interval: str, limit: Optional[int] = None) -> np.ndarray:
+        if self.candle_cache is None:
+            return await self._query_candle_records(ticker_id, interval, limit)
+        records = self.candle_cache.read(ticker_id, interval, limit)
+        if records is None:
+            records = await self._query_candle_records(ticker_id, interval)
+            self.candle_cache.write(ticker_id, interval, records)
+            records = records[-limit:] if limit else records
+        return records
+
+    async def get_data_for_init_ema(self, ticker_id: int, interval: str) -> pd.DataFrame:
+        return records_to_data_frame(await self._get_candle_records(ticker_id, interval))
 
     async def add_ema(self, ticker_id: int, interval: str, span: int, timestamp_column: datetime, ema_value: float,
                       atr: float) -> None:
@@ -218,60 +249,34 @@ class BotPostgresRepository:
             ]
 
     async def get_data_for_ema(self, ticker_id: int, interval: str, span: int) -> pd.DataFrame:
-        async with self.sessionmaker() as session:
-            result = await session.execute(
-                select(CandleModel).
-                where(CandleModel.ticker_id == ticker_id, CandleModel.interval == interval).
-                order_by(CandleModel.timestamp_column.desc()).
-                limit(span * 2)
-            )
-            candles = result.scalars().all()
-            candles_data = [
-                {
-                    'timestamp_column': candle.timestamp_column,
-                    'close': candle.close,
-                    'open': candle.open,
-                    'high': candle.high,
-                    'low': candle.low
-                }
-                for candle in candles
-            ]
-            df = pd.DataFrame(candles_data)
-            df = df.iloc[::-1]
-            return df
-
-    async def get_latest_ema_for_ticker(self, ticker_id: int, interval: str, span: int) -> Optional[EMAModel]:
-        async with self.sessionmaker() as session:
-            result = await session.execute(
-                select(EMAModel).
-                where(EMAModel.ticker_id == ticker_id, EMAModel.interval == interval, EMAModel.span == span).
-                order_by(EMAModel.timestamp_column.desc()).
-                limit(1)
-            )
-            row = result.scalars().first()
-            return Ema(
-                timestamp_column=str(row.timestamp_column),
-                span=row.span,
-                ema=row.ema,
-                atr=row.atr
-            ) if row else None
-
-    async def get_penultimate_ema_for_ticker(self, ticker_id: int, interval: str, span) -> Optional[Ema]:
-        async with self.sessionmaker() as session:
+        return records_to_data_frame(await self._get_candle_records(ticker_id, interval, limit=span * 2))
+
+    async def get_data_since(self, ticker_id: int, interval: str, since: datetime, lookback: int) -> pd.DataFrame:
+        if self.candle_cache is not None:
+            records = await self._get_candle_records(ticker_id, interval)
+            start = np.searchsorted(records['timestamp_column'], np.datetime64(since, 'us'))
+            return records_to_data_frame(records[max(start - lookback, 0):])
+        async with self.sessionmaker() as session:
+            if lookback > 0:
+                # Как и в кэше: если свечей до since меньше lookback, берем историю с начала
+                lookback_start = func.coalesce((
+                    select(CandleModel.timestamp_column).
+                    where(CandleModel.ticker_id == ticker_id, CandleModel.interval == interval,
+                          CandleModel.timestamp_column < since).
+                    order_by(CandleModel.timestamp_column.desc()).
+                    offset(lookback - 1).
+                    limit(1)
+                ).scalar_subquery(), datetime.min)
+            else:
+                lookback_start = since
             result = await session.execute(
-                select(EMAModel).
-                where(EMAModel.ticker_id == ticker_id, EMAModel.interval == interval, EMAModel.span == span).
-                order_by(EMAModel.timestamp_column.desc()).
-                offset(1).
-                limit(1)
+                select(CandleModel.timestamp_column, CandleModel.open, CandleModel.high, CandleModel.low,
+                       CandleModel.close, CandleModel.volume).
+                where(CandleModel.ticker_id == ticker_id, CandleModel.interval == interval,
+                      CandleModel.timestamp_column >= lookback_start).
+                order_by(CandleModel.timestamp_column)
             )
-            row = result.scalars().first()
-            return Ema(
-                timestamp_column=row.timestamp_column,
-                span=row.span,
-                ema=row.ema,
-                atr=row.atr
-            ) if row else None
+            return records_to_data_frame(candles_to_records(result.all()))
 
     async def get_users_for_ticker(self, ticker_id: int) -> list[int]:
         async with self.sessionmaker() as session:
@@ -281,14 +286,6 @@ class BotPostgresRepository:
             )
             return [row.user_id for row in result.scalars()]
 
-    async def get_ticker_name_by_id(self, ticker_id: int) -> Optional[str]:
-        async with self.sessionmaker() as session:
-            result = await session.execute(
-                select(TickerModel.name).
-                where(TickerModel.ticker_id == ticker_id)
-            )
-            return result.scalar()
-
     async def get_last_timestamp_by_interval_and_ticker(self, ticker_id: int, interval: CandleInterval) -> datetime:
         async with self.sessionmaker() as session:
             result = await session.execute(
@@ -318,19 +315,62 @@ class BotPostgresRepository:
                 await session.rollback()
                 return False
 
-    async def get_ema_cross_count(self, ticker_id: int, interval: str, span: int, start_time: datetime,
-                                  end_time: datetime) -> int:
+    async def add_ema_crosses_since(self, interval: str, span: int, start_time: datetime) -> int:
+        async with self.sessionmaker() as session:
+            sql = text("""
+                WITH bounds AS (
+                    -- Предыдущая свеча перед окном нужна для LAG на первой свече окна
+                    SELECT t.ticker_id, coalesce((
+                        SELECT max(p.timestamp_column)
+                        FROM candles p
+                        WHERE p.ticker_id = t.ticker_id AND p.interval = :interval
+                            AND p.timestamp_column < :start_time
+                    ), :start_time) AS since
+                    FROM tickers t
+                )
+                INSERT INTO ema_cross (ticker_id, interval, span, timestamp_column)
+                SELECT ticker_id, :interval, :span, timestamp_column
+                FROM (
+                    SELECT
+                        c.ticker_id,
+                        c.timestamp_column,
+                        c.high,
+                        c.low,
+                        e.ema,
+                        LAG(c.high) OVER w AS prev_high,
+                        LAG(c.low) OVER w AS prev_low,
+                        LAG(e.ema) OVER w AS prev_ema
+                    FROM candles c
+                    JOIN ema e ON e.ticker_id = c.ticker_id
+                        AND e.interval = c.interval
+                        AND e.timestamp_column = c.timestamp_column
+                        AND e.span = :span
+                    JOIN bounds b ON b.ticker_id = c.ticker_id
+                    WHERE c.interval = :interval AND c.timestamp_column >= b.since
+                    WINDOW w AS (PARTITION BY c.ticker_id ORDER BY c.timestamp_column)
+                ) AS series
+                WHERE timestamp_column >= :start_time AND prev_ema IS NOT NULL
+                    AND ((high >= ema AND prev_high < prev_ema) OR (prev_low > prev_ema AND low <= ema))
+                ON CONFLICT ON CONSTRAINT unique_ema_cross_combination DO NOTHING;
+            """)
+
+            result = await session.execute(sql, {'interval': interval, 'span': span, 'start_time': start_time})
+            await session.commit()
+            return result.rowcount
+
+    async def get_ema_crosses_since(self, interval: str, span: int,
+                                    start_time: datetime) -> list[tuple[int, datetime]]:
         async with self.sessionmaker() as session:
             result = await session.execute(
-                select(func.count()).
+                select(EMACrossModel.ticker_id, EMACrossModel.timestamp_column).
                 where(
-                    EMACrossModel.ticker_id == ticker_id,
                     EMACrossModel.interval == interval,
                     EMACrossModel.span == span,
-                    EMACrossModel.timestamp_column.between(start_time, end_time)
-                )
+                    EMACrossModel.timestamp_column >= start_time
+                ).
+                order_by(EMACrossModel.ticker_id, EMACrossModel.timestamp_column)
             )
-            return result.scalar()
+            return [(row.ticker_id, row.timestamp_column) for row in result]
 
     async def bulk_add_ema(self, ema_data: list[Ema]) -> None:
         async with self.sessionmaker() as session:
@@ -340,134 +380,287 @@ class BotPostgresRepository:
                 session.add(ema_model)
             await session.commit()
 
-    async def get_ema_for_ticker_by_period(self, ticker_id: int, interval: str, span,
-                                           end_time: datetime) -> Optional[Ema]:
+    async def get_last_two_candles_by_interval(self, intervals: list[str],
+                                               as_of: Optional[datetime] = None) -> dict[str, dict[int, list[Candle]]]:
+        async with self.sessionmaker() as session:
+            sql = text("""
+                WITH NumberedCandles AS (
+                    SELECT
+                        ticker_id,
+                        interval,
+                        timestamp_column,
+                        open,
+                        high,
+                        low,
+                        close,
+                        ROW_NUMBER() OVER(PARTITION BY ticker_id, interval ORDER BY timestamp_column DESC) AS rn
+                    FROM candles
+                    WHERE interval = ANY(CAST(:intervals AS VARCHAR[]))
+                        AND (CAST(:as_of AS TIMESTAMP) IS NULL OR timestamp_column <= :as_of)
+                )
+                SELECT ticker_id, interval, timestamp_column, open, high, low, close
+                FROM NumberedCandles
+                WHERE rn <= 2
+                ORDER BY ticker_id, interval, timestamp_column DESC;
+            """)
+
+            result = await session.execute(sql, {'intervals': intervals, 'as_of': as_of})
+            candles = {interval: {} for interval in intervals}
+            for row in result.mappings():
+                candles[row['interval']].setdefault(row['ticker_id'], []).append(
+                    Candle(timestamp_column=row['timestamp_column'], open=row['open'], high=row['high'],
+                           low=row['low'], close=row['close'])
+                )
+            return candles
+
+    async def get_last_two_emas_by_interval(
+            self, keys: list[tuple[str, int]],
+            as_of: Optional[datetime] = None) -> dict[tuple[str, int], dict[int, list[Ema]]]:
+        async with self.sessionmaker() as session:
+            sql = text("""
+                WITH NumberedEma AS (
+                    SELECT
+                        e.ticker_id,
+                        e.interval,
+                        e.span,
+                        e.timestamp_column,
+                        e.ema,
+                        e.atr,
+                        ROW_NUMBER() OVER(PARTITION BY e.ticker_id, e.interval, e.span
+                                          ORDER BY e.timestamp_column DESC) AS rn
+                    FROM ema e
+                    JOIN unnest(CAST(:intervals AS VARCHAR[]), CAST(:spans AS INTEGER[])) AS k(interval, span)
+                        ON e.interval = k.interval AND e.span = k.span
+                    WHERE CAST(:as_of AS TIMESTAMP) IS NULL OR e.timestamp_column <= :as_of
+                )
+                SELECT ticker_id, interval, span, timestamp_column, ema, atr
+                FROM NumberedEma
+                WHERE rn <= 2
+                ORDER BY ticker_id, interval, span, timestamp_column DESC;
+            """)
+
+            result = await session.execute(sql, {'intervals': [interval for interval, _ in keys],
+                                                 'spans': [span for _, span in keys], 'as_of': as_of})
+            emas = {key: {} for key in keys}
+            for row in result.mappings():
+                emas[(row['interval'], row['span'])].setdefault(row['ticker_id'], []).append(
+                    Ema(ticker_id=row['ticker_id'], interval=row['interval'], span=row['span'],
+                        timestamp_column=row['timestamp_column'], ema=row['ema'], atr=row['atr'])
+                )
+            return emas
+
+    async def get_candle_timestamps_since(self, interval: str, ticker_ids: list[int],
+                                          since: datetime) -> dict[int, list[datetime]]:
         async with self.sessionmaker() as session:
             result = await session.execute(
-                select(EMAModel).
-                where(
-                    EMAModel.ticker_id == ticker_id,
-                    EMAModel.interval == interval,
-                    EMAModel.span == span,
-                    EMAModel.timestamp_column <= end_time
-                ).
-                order_by(EMAModel.timestamp_column.desc()).
-                limit(1)
+                select(CandleModel.ticker_id, CandleModel.timestamp_column).
+                where(CandleModel.interval == interval, CandleModel.ticker_id.in_(ticker_ids),
+                      CandleModel.timestamp_column > since).
+                order_by(CandleModel.ticker_id, CandleModel.timestamp_column)
             )
-            if row := result.scalars().first():
-                return Ema(
-                    timestamp_column=str(row.timestamp_column),
-                    span=row.span,
-                    ema=row.ema,
+            timestamps = {}
+            for ticker_id, timestamp in result.all():
+                timestamps.setdefault(ticker_id, []).append(timestamp)
+            return timestamps
+
+    async def get_active_strategies(self) -> list[ActiveStrategy]:
+        async with self.sessionmaker() as session:
+            result = await session.execute(
+                select(StrategyModel.name, TimeframeModel.name, func.array_agg(UserStrategyModel.user_id)).
+                join(StrategyModel, StrategyModel.strategy_id == UserStrategyModel.strategy_id).
+                join(TimeframeModel, TimeframeModel.timeframe_id == UserStrategyModel.timeframe_id).
+                join(UserModel, UserModel.user_id == UserStrategyModel.user_id).
+                where(UserModel.disable.isnot(True)).
+                group_by(StrategyModel.name, TimeframeModel.name)
+            )
+            return [ActiveStrategy(strategy_name=strategy_name, timeframe_name=timeframe_name, user_ids=user_ids)
+                    for strategy_name, timeframe_name, user_ids in result.all()]
+
+    async def get_atr_states(self) -> dict[tuple[int, str], AtrState]:
+        async with self.sessionmaker() as session:
+            result = await session.execute(select(ATRStateModel))
+            return {
+                (row.ticker_id, row.interval): AtrState(
+                    ticker_id=row.ticker_id,
+                    interval=row.interval,
+                    timestamp_column=row.timestamp_column,
+                    last_close=row.last_close,
+                    tr_window=row.tr_window,
                     atr=row.atr
+                ) for row in result.scalars()}
+
+    async def save_atr_states(self, states: list[AtrState]) -> None:
+        if not states:
+            return
+        async with self.sessionmaker() as session:
+            query = insert(ATRStateModel).values([state.model_dump() for state in states])
+            await session.execute(
+                query.on_conflict_do_update(
+                    constraint='unique_atr_state',
+                    set_={
+                        'timestamp_column': query.excluded.timestamp_column,
+                        'last_close': query.excluded.last_close,
+                        'tr_window': query.excluded.tr_window,
+                        'atr': query.excluded.atr,
+                    }
                 )
-            return None
+            )
+            await session.commit()
 
-    async def get_penultimate_ema_for_ticker_by_period(self, ticker_id: int, interval: str, span: int,
-                                                       end_time: datetime) -> Optional[Ema]:
+    async def get_latest_emas(self, interval: str, spans: list[int],
+                              ticker_ids: list[int]) -> dict[tuple[int, int], Ema]:
         async with self.sessionmaker() as session:
-            subquery = (
-                select(EMAModel).
-                where(
-                    EMAModel.ticker_id == ticker_id,
-                    EMAModel.interval == interval,
-                    EMAModel.span == span,
-                    EMAModel.timestamp_column <= end_time
-                ).
-                order_by(EMAModel.timestamp_column.desc()).
-                limit(2)
-            ).alias('subquery')
+            sql = text("""
+                SELECT t.ticker_id, s.span, e.timestamp_column, e.ema, e.atr
+                FROM unnest(CAST(:ticker_ids AS BIGINT[])) AS t(ticker_id)
+                CROSS JOIN unnest(CAST(:spans AS INTEGER[])) AS s(span)
+                JOIN LATERAL (
+                    SELECT timestamp_column, ema, atr
+                    FROM ema
+                    WHERE ticker_id = t.ticker_id AND interval = :interval AND span = s.span
+                    ORDER BY timestamp_column DESC
+                    LIMIT 1
+                ) e ON TRUE;
+            """)
 
-            result = await session.execute(
-                select(subquery.c.timestamp_column, subquery.c.span, subquery.c.ema, subquery.c.atr).
-                order_by(subquery.c.timestamp_column.desc()).
-                offset(1)
-            )
-            if row := result.first():
-                return Ema(
-                    timestamp_column=row[0],
-                    span=row[1],
-                    ema=row[2],
-                    atr=row[3]
+            result = await session.execute(sql, {'interval': interval, 'spans': spans, 'ticker_ids': ticker_ids})
+            return {
+                (row['ticker_id'], row['span']): Ema(
+                    ticker_id=row['ticker_id'],
+                    interval=interval,
+                    span=row['span'],
+                    timestamp_column=row['timestamp_column'],
+                    ema=row['ema'],
+                    atr=row['atr']
                 )
-            return None
+                for row in result.mappings().all()
+            }
 
-    async def get_last_two_candles_for_each_ticker(self, interval: str) -> dict[int, list[Candle]]:
+    async def get_candles_since(self, interval: str, since: dict[int, datetime]) -> pd.DataFrame:
+        if self.candle_cache is not None:
+            frames = []
+            for ticker_id, start_time in since.items():
+                records = await self._get_candle_records(ticker_id, interval)
+                start = np.searchsorted(records['timestamp_column'], np.datetime64(start_time, 'us'))
+                frames.append(records_to_data_frame(records[start:]).assign(ticker_id=ticker_id))
+            return pd.concat(frames, ignore_index=True)
         async with self.sessionmaker() as session:
             sql = text("""
-               WITH NumberedCandles AS (
-                SELECT 
-                    ticker_id,
-                    timestamp_column,
-                    open,
-                    high,
-                    low,
-                    close,
-                    ROW_NUMBER() OVER(PARTITION BY ticker_id ORDER BY timestamp_column DESC) AS rn
-                FROM candles
-                WHERE interval = :interval
+                SELECT c.ticker_id, c.timestamp_column, c.open, c.high, c.low, c.close, COALESCE(c.volume, 0)
+                FROM unnest(CAST(:ticker_ids AS BIGINT[]), CAST(:since AS TIMESTAMP[])) AS s(ticker_id, since)
+                JOIN candles c ON c.ticker_id = s.ticker_id AND c.interval = :interval
+                    AND c.timestamp_column >= s.since
+                ORDER BY c.ticker_id, c.timestamp_column;
+            """)
+
+            result = await session.execute(
+                sql, {'interval': interval, 'ticker_ids': list(since.keys()), 'since': list(since.values())})
+            df = pd.DataFrame(result.all(),
+                              columns=['ticker_id', 'timestamp_column', 'open', 'high', 'low', 'close', 'volume'])
+            return df.astype({'open': float, 'high': float, 'low': float, 'close': float, 'volume': int})
+
+    async def bulk_upsert_ema(self, ema_data: list[Ema]) -> None:
+        if not ema_data:
+            return
+        async with self.sessionmaker() as session:
+            query = insert(EMAModel)
+            await session.execute(
+                query.on_conflict_do_update(
+                    constraint='unique_ema',
+                    set_={'ema': query.excluded.ema, 'atr': query.excluded.atr}
+                ),
+                [ema.model_dump(exclude_unset=True) for ema in ema_data]
             )
-            SELECT 
-                ticker_id,
-                timestamp_column,
-                open,
-                high,
-                low,
-                close
-            FROM NumberedCandles
-            WHERE rn <= 2
-            ORDER BY ticker_id, timestamp_column DESC;
-               """)
-
-            result = await session.execute(sql, {'interval': interval})
-            return transform_candle_result(result)
-
-    async def get_two_candles_for_each_ticker_by_period(self, interval: str,
-                                                        timestamp: datetime) -> dict[int, list[Candle]]:
+            await session.commit()
+
+    async def get_indicators_to_calc(self) -> list[IndicatorToCalc]:
         async with self.sessionmaker() as session:
-            sql = text("""
-           WITH NumberedCandles AS (
-               SELECT 
-                   ticker_id,
-                   timestamp_column,
-                   open,
-                   high,
-                   low,
-                   close,
-                   ROW_NUMBER() OVER(PARTITION BY ticker_id ORDER BY timestamp_column DESC) AS rn
-               FROM candles
-               WHERE interval = :interval AND timestamp_column <= :timestamp
-           )
-           SELECT 
-               ticker_id,
-               timestamp_column,
-               open,
-               high,
-               low,
-               close
-           FROM NumberedCandles
-           WHERE rn <= 2
-           ORDER BY ticker_id, timestamp_column DESC;
-           """)
-
-            result = await session.execute(sql, {'interval': interval, 'timestamp': timestamp})
-            return transform_candle_result(result)
-
-    async def get_last_candle(self, ticker_id: int, interval: str) -> Optional[Candle]:
+            result = await session.execute(select(IndicatorToCalcModel))
+            return [IndicatorToCalc(interval=row.interval, name=row.name, params=row.params or {})
+                    for row in result.scalars()]
+
+    async def get_indicator_states(self, interval: str) -> dict[int, IndicatorState]:
         async with self.sessionmaker() as session:
             result = await session.execute(
-                select(CandleModel)
-                .where(CandleModel.ticker_id == ticker_id, CandleModel.interval == interval)
-                .order_by(CandleModel.timestamp_column.desc())
-                .limit(1)
+                select(IndicatorStateModel).where(IndicatorStateModel.interval == interval)
             )
-            if candle_model := result.scalars().first():
-                return Candle(
-                    timestamp_column=candle_model.timestamp_column,
-                    open=float(candle_model.open),
-                    high=float(candle_model.high),
-                    low=float(candle_model.low),
-                    close=float(candle_model.close)
-                )
-            else:
-                return None
+            return {
+                row.ticker_id: IndicatorState(
+                    ticker_id=row.ticker_id,
+                    interval=row.interval,
+                    timestamp_column=row.timestamp_column,
+                    state=row.state
+                ) for row in result.scalars()}
+
+    async def save_indicator_states(self, states: list[IndicatorState]) -> None:
+        if not states:
+            return
+        async with self.sessionmaker() as session:
+            query = insert(IndicatorStateModel)
+            await session.execute(
+                query.on_conflict_do_update(
+                    constraint='unique_indicator_state',
+                    set_={'timestamp_column': query.excluded.timestamp_column, 'state': query.excluded.state}
+                ),
+                [state.model_dump() for state in states]
+            )
+            await session.commit()
+
+    async def bulk_upsert_indicator_values(self, values: list[IndicatorValue]) -> None:
+        if not values:
+            return
+        async with self.sessionmaker() as session:
+            query = insert(IndicatorValueModel)
+            await session.execute(
+                query.on_conflict_do_update(
+                    constraint='unique_indicator_value',
+                    set_={'values': query.excluded['values']}
+                ),
+                [value.model_dump() for value in values]
+            )
+            await session.commit()
+
+    async def get_last_candle_timestamps(self, ticker_ids: list[int],
+                                         intervals: list[str]) -> dict[tuple[int, str], datetime]:
+        async with self.sessionmaker() as session:
+            sql = text("""
+                SELECT t.ticker_id, i.interval, c.timestamp_column
+                FROM unnest(CAST(:ticker_ids AS BIGINT[])) AS t(ticker_id)
+                CROSS JOIN unnest(CAST(:intervals AS VARCHAR[])) AS i(interval)
+                JOIN LATERAL (
+                    SELECT timestamp_column
+                    FROM candles
+                    WHERE ticker_id = t.ticker_id AND interval = i.interval
+                    ORDER BY timestamp_column DESC
+                    LIMIT 1
+                ) c ON TRUE;
+            """)
+
+            result = await session.execute(sql, {'ticker_ids': ticker_ids, 'intervals': intervals})
+            return {(row['ticker_id'], row['interval']): row['timestamp_column'] for row in result.mappings().all()}
+
+    async def get_evaluator_checkpoints(self) -> dict[tuple[str, str, int], datetime]:
+        async with self.sessionmaker() as session:
+            result = await session.execute(select(EvaluatorCheckpointModel))
+            return {(row.strategy, row.interval, row.ticker_id): row.timestamp_column for row in result.scalars()}
+
+    async def save_evaluator_checkpoints(self, checkpoints: list[EvaluatorCheckpoint]) -> None:
+        if not checkpoints:
+            return
+        async with self.sessionmaker() as session:
+            query = insert(EvaluatorCheckpointModel)
+            await session.execute(
+                query.on_conflict_do_update(
+                    constraint='unique_evaluator_checkpoint',
+                    set_={'timestamp_column': query.excluded.timestamp_column}
+                ),
+                [checkpoint.model_dump() for checkpoint in checkpoints]
+            )
+            await session.commit()
+
+    async def save_signal_latencies(self, latencies: list[SignalLatency]) -> None:
+        if not latencies:
+            return
+        async with self.sessionmaker() as session:
+            await session.execute(insert(SignalLatencyModel), [latency.model_dump() for latency in latencies])
+            await session.commit()
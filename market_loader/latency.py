@@ -0,0 +1,113 @@
+import json
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from market_loader.constants import latency_buckets, latency_max_age, latency_stages
+from market_loader.models import CandleInterval, SignalLatency
+
+interval_durations = {
+    CandleInterval.min_5.value: timedelta(minutes=5),
+    CandleInterval.min_15.value: timedelta(minutes=15),
+    CandleInterval.hour.value: timedelta(hours=1),
+    CandleInterval.day.value: timedelta(days=1),
+}
+
+TraceKey = tuple[int, str, datetime]
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class LatencyHistogram:
+
+    def __init__(self, buckets: list[float] = latency_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for pos, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return self.buckets[pos] if pos < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+            'buckets': {str(bucket): count for bucket, count in zip(self.buckets + ['inf'], self.counts)},
+        }
+
+
+class LatencyTracker:
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in latency_stages}
+        self.traces: dict[TraceKey, dict[str, datetime]] = {}
+        self.signals: set[TraceKey] = set()
+        self.completed: list[SignalLatency] = []
+
+    def mark(self, ticker_id: int, interval: str, timestamp: datetime, stage: str,
+             at: Optional[datetime] = None) -> None:
+        # Задержка считается от закрытия свечи; старые свечи при дозагрузке истории не учитываются
+        if hasattr(timestamp, 'to_pydatetime'):
+            timestamp = timestamp.to_pydatetime()
+        at = at or utc_now()
+        closed_at = timestamp + interval_durations.get(interval, timedelta())
+        latency = (at - closed_at).total_seconds()
+        if latency > latency_max_age:
+            return
+        key = (ticker_id, interval, timestamp)
+        trace = self.traces.setdefault(key, {})
+        if stage in trace:
+            return
+        trace[stage] = at
+        self.histograms[stage].observe(max(latency, 0.0))
+        if stage == latency_stages[-1] and key in self.signals:
+            self.signals.discard(key)
+            self.completed.append(SignalLatency(ticker_id=ticker_id, interval=interval, timestamp_column=timestamp,
+                                                **{f"{name}_at": value for name, value in trace.items()}))
+
+    def mark_signal(self, ticker_id: int, interval: str, timestamp: datetime) -> None:
+        self.signals.add((ticker_id, interval, timestamp))
+
+    def pop_completed(self) -> list[SignalLatency]:
+        completed, self.completed = self.completed, []
+        return completed
+
+    def prune(self) -> None:
+        border = utc_now() - timedelta(seconds=latency_max_age * 2)
+        for key in [key for key in self.traces if key[2] < border]:
+            del self.traces[key]
+            self.signals.discard(key)
+
+    def to_dict(self) -> dict:
+        return {stage: histogram.to_dict() for stage, histogram in self.histograms.items()}
+
+    def export(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump({'updated_at': utc_now().isoformat(), 'stages': self.to_dict()}, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+
+latency_tracker = LatencyTracker()
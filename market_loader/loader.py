@@ -9,7 +9,9 @@ from loguru import logger
 
 from market_loader.constants import attempts_to_tcs_request, deep_for_hour_candles, tcs_request_timeout
 from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
-from market_loader.models import ApiConfig, CandleInterval, FindInstrumentRequest, InstrumentRequest, Ticker
+from market_loader.latency import latency_tracker, utc_now
+from market_loader.models import (ApiConfig, CandleInterval, DirtyRange, FindInstrumentRequest, InstrumentRequest,
+                                  Ticker)
 from market_loader.utils import (convert_to_base_date, dict_to_float, get_correct_time_format, get_interval,
                                  MaxRetriesExceededError,
                                  round_date, to_end_of_day, to_start_of_day)
@@ -25,6 +27,7 @@ class MarketDataLoader:
         self.last_request_time = current_time
         self.instrument_query_counter = 0
         self.market_query_counter = 0
+        self.dirty: dict[tuple[int, str], DirtyRange] = {}
 
     async def _request_with_count(self, url: str, headers: dict, json: dict, query_type: str) -> Response:
 
@@ -152,15 +155,31 @@ class MarketDataLoader:
         if len(response_data['candles']) > 0:
             logger.info(
                 f"Запись | интервал: {get_interval(interval)}; тикер: {ticker.name}; id: {ticker.ticker_id}")
+        fetched_at = utc_now()
         for candle in response_data['candles']:
-            await self.db.add_candle(ticker.ticker_id,
-                                     interval.value,
-                                     convert_to_base_date(candle['time']).replace(tzinfo=None),
-                                     dict_to_float(candle['open']),
-                                     dict_to_float(candle['high']),
-                                     dict_to_float(candle['low']),
-                                     dict_to_float(candle['close']),
-                                     )
+            timestamp = convert_to_base_date(candle['time']).replace(tzinfo=None)
+            inserted = await self.db.add_candle(ticker.ticker_id,
+                                                interval.value,
+                                                timestamp,
+                                                dict_to_float(candle['open']),
+                                                dict_to_float(candle['high']),
+                                                dict_to_float(candle['low']),
+                                                dict_to_float(candle['close']),
+                                                int(candle.get('volume', 0)),
+                                                )
+            if inserted:
+                self._mark_dirty(ticker.ticker_id, interval.value, timestamp)
+                latency_tracker.mark(ticker.ticker_id, interval.value, timestamp, 'fetched', fetched_at)
+                latency_tracker.mark(ticker.ticker_id, interval.value, timestamp, 'inserted')
+
+    def _mark_dirty(self, ticker_id: int, interval: str, timestamp: datetime) -> None:
+        dirty_range = self.dirty.get((ticker_id, interval))
+        if dirty_range is None:
+            self.dirty[(ticker_id, interval)] = DirtyRange(start=timestamp, end=timestamp, count=1)
+            return
+        dirty_range.start = min(dirty_range.start, timestamp)
+        dirty_range.end = max(dirty_range.end, timestamp)
+        dirty_range.count += 1
 
     async def _load_and_save_ticker_interval(self, ticker: Ticker, interval: CandleInterval, start_time: datetime,
                                              end_time: datetime) -> None:
@@ -176,7 +195,8 @@ class MarketDataLoader:
                         (f"Ошибка записи свечей | интервал: {get_interval(interval)}; тикер: {ticker.name}; id: "
                          f"{ticker.ticker_id}; время с {end_time} по {start_time}"))
 
-    async def load_data(self) -> None:
+    async def load_data(self) -> dict[tuple[int, str], DirtyRange]:
+        self.dirty = {}
         await self._update_tickers()
         tickers = await self.db.get_tickers_with_figi()
 
@@ -225,3 +245,6 @@ class MarketDataLoader:
                     interval=CandleInterval.day,
                     start_time=last_day_update,
                     end_time=datetime.now(timezone.utc))
+        logger.info(f"Новые свечи | пар тикер-интервал: {len(self.dirty)}; "
+                    f"свечей: {sum(dirty_range.count for dirty_range in self.dirty.values())}")
+        return self.dirty
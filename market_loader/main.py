@@ -4,19 +4,24 @@ from datetime import datetime
 
 from dotenv import load_dotenv
 from loguru import logger
+from redis.asyncio import Redis
 
-from market_loader.constants import mine_circle_sleep_time
-from market_loader.infrasturcture.entities import get_sessionmaker
+from market_loader.constants import candle_cache_dir, latency_export_path, mine_circle_sleep_time
+from market_loader.event_listener import EvaluationListener
+from market_loader.infrasturcture.candle_cache import CandleCache
+from market_loader.infrasturcture.entities import get_sessionmaker, storage_url
 from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.latency import latency_tracker
 from market_loader.loader import MarketDataLoader
 from market_loader.models import ApiConfig
+from market_loader.status_publisher import StatusPublisher
 from market_loader.strategy_evaluator import StrategyEvaluator
 from market_loader.technical_indicators_calculator import TechnicalIndicatorsCalculator
 
 load_dotenv()
 
 sessionmaker = get_sessionmaker()
-db = BotPostgresRepository(sessionmaker)
+db = BotPostgresRepository(sessionmaker, candle_cache=CandleCache(os.getenv("CANDLE_CACHE_DIR", candle_cache_dir)))
 
 config = ApiConfig()
 config.token = os.getenv("TOKEN")
@@ -28,19 +33,41 @@ config.find_instrument = "tinkoff.public.invest.api.contract.v1.InstrumentsServi
 loader = MarketDataLoader(db=db, config=config)
 ti_calculator = TechnicalIndicatorsCalculator(db=db)
 strategy_evaluator = StrategyEvaluator(db=db, token=os.getenv("BOT_TOKEN"), chat_id=int(os.getenv("DEBUG_CHAT_ID")))
+# Тот же Redis и та же база, что и у FSM бота
+status_publisher = StatusPublisher(db=db, redis=Redis(host=os.getenv("REDIS_HOST", "localhost"),
+                                                      port=int(os.getenv("REDIS_PORT", 6379)), db=5,
+                                                      decode_responses=True))
+
+
+mode = os.getenv("MARKET_LOADER_MODE", "all")
 
 
 async def main():
+    if mode == "evaluate":
+        logger.info("Проверка стратегий по событиям началась")
+        listener = EvaluationListener(storage_url().replace("postgresql+asyncpg", "postgresql"), strategy_evaluator)
+        await listener.run()
+        return
     logger.info("Загрузка началась")
-    while True:
-        start_time = datetime.now()
-        await loader.load_data()
-        await ti_calculator.calculate()
-        await strategy_evaluator.check_strategy()
-        end_time = datetime.now()
-        sleep_time = mine_circle_sleep_time - (end_time - start_time).total_seconds()
-        if sleep_time > 0:
-            await asyncio.sleep(sleep_time)
+    try:
+        while True:
+            start_time = datetime.now()
+            dirty = await loader.load_data()
+            await ti_calculator.calculate(dirty)
+            if mode != "ingest":
+                await strategy_evaluator.check_strategy(dirty)
+            await status_publisher.publish()
+            # В режиме ingest стратегии не проверяются, поэтому трассы чистятся здесь
+            latency_tracker.prune()
+            latency_tracker.export(os.getenv("LATENCY_EXPORT_PATH", latency_export_path))
+            end_time = datetime.now()
+            sleep_time = mine_circle_sleep_time - (end_time - start_time).total_seconds()
+            if sleep_time > 0:
+                await asyncio.sleep(sleep_time)
+    finally:
+        # Останавливаем процессы пересчета истории и отправляем оставшиеся сигналы
+        ti_calculator.close()
+        await strategy_evaluator.notifier.close()
 
 
 if __name__ == "__main__":
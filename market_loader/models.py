@@ -4,6 +4,8 @@ from typing import Optional
 
 from pydantic import BaseModel
 
+from market_loader.constants import ema_cross_window
+
 
 class ApiConfig(BaseModel):
     token: str = None
@@ -66,6 +68,7 @@ class Candle(BaseModel):
     high: float
     low: float
     close: float
+    volume: int = 0
 
 
 class Ema(BaseModel):
@@ -77,7 +80,96 @@ class Ema(BaseModel):
     atr: float = 0
 
 
-class ReboundParam(BaseModel):
-    cross_count_4: int
-    cross_count_1: int
-    hour_candle: Optional[Candle] = None
+class AtrState(BaseModel):
+    ticker_id: int
+    interval: str
+    timestamp_column: Optional[datetime] = None
+    last_close: Optional[float] = None
+    tr_window: list[float] = []
+    atr: Optional[float] = None
+
+
+class IndicatorToCalc(BaseModel):
+    interval: str
+    name: str
+    params: dict = {}
+
+
+class IndicatorState(BaseModel):
+    ticker_id: int
+    interval: str
+    timestamp_column: Optional[datetime] = None
+    state: dict = {}
+
+
+class IndicatorValue(BaseModel):
+    ticker_id: int
+    interval: str
+    indicator: str
+    timestamp_column: datetime
+    values: dict
+
+
+class ActiveStrategy(BaseModel):
+    strategy_name: str
+    timeframe_name: str
+    user_ids: list[int]
+
+
+class BacktestParams(BaseModel):
+    span: int = 200
+    older_span: int = 1000
+    cross_window: int = ema_cross_window
+    min_cross: int = 1
+    max_cross: int = 2
+
+
+class UserTicker(BaseModel):
+    user_ticker_id: int = None
+    user_id: int
+    ticker_id: int
+    direction: Optional[str] = None
+
+
+class Signal(BaseModel):
+    ticker_id: int
+    direction: str
+    message: str
+
+
+class EvaluatorCheckpoint(BaseModel):
+    strategy: str
+    interval: str
+    ticker_id: int
+    timestamp_column: datetime
+
+
+class SignalLatency(BaseModel):
+    ticker_id: int
+    interval: str
+    timestamp_column: datetime
+    fetched_at: Optional[datetime] = None
+    inserted_at: Optional[datetime] = None
+    ema_computed_at: Optional[datetime] = None
+    evaluated_at: Optional[datetime] = None
+    queued_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+
+
+class DirtyRange(BaseModel):
+    start: datetime
+    end: datetime
+    count: int = 0
+
+
+class TickerStatus(BaseModel):
+    ticker_id: int
+    name: str
+    interval: str
+    timestamp_column: datetime
+    close: float
+    emas: dict[int, float] = {}
+    atr_percent: Optional[float] = None
+    atr_distance: Optional[float] = None
+    cross_count: int = 0
+    updated_at: datetime
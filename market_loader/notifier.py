@@ -0,0 +1,139 @@
+import asyncio
+from collections import defaultdict
+from time import monotonic
+from typing import Optional
+
+import httpx
+from loguru import logger
+
+from market_loader.constants import (attempts_to_send_tg_msg, tg_chat_interval, tg_global_rate, tg_max_retry_time,
+                                     tg_message_limit, tg_send_timeout)
+from market_loader.latency import latency_tracker, TraceKey
+
+
+def split_digest(messages: list[str], limit: int = tg_message_limit) -> list[str]:
+    digests, current = [], ''
+    for message in messages:
+        candidate = f"{current}\n\n{message}" if current else message
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            digests.append(current)
+        current = message
+        if len(message) > limit:
+            # Длинный сигнал режется по строкам, чтобы не разорвать HTML-разметку
+            *parts, current = split_lines(message, limit)
+            digests.extend(parts)
+    if current:
+        digests.append(current)
+    return digests
+
+
+def split_lines(message: str, limit: int) -> list[str]:
+    parts, current = [], ''
+    for line in message.split('\n'):
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            parts.append(current)
+        # Строка длиннее лимита не содержит разметки сигнала, ее можно резать по символам
+        while len(line) > limit:
+            parts.append(line[:limit])
+            line = line[limit:]
+        current = line
+    return parts + [current] if current else parts
+
+
+class TelegramNotifier:
+
+    def __init__(self, token: str):
+        self.base_url = f"https://api.telegram.org/bot{token}/"
+        self.client: Optional[httpx.AsyncClient] = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        self.pending: dict[int, list[tuple[str, Optional[TraceKey]]]] = defaultdict(list)
+        self.last_sent = 0.0
+        self.last_sent_by_chat: dict[int, float] = {}
+
+    def start(self) -> None:
+        if self.worker is None or self.worker.done():
+            self.client = self.client or httpx.AsyncClient(base_url=self.base_url, timeout=tg_send_timeout)
+            self.worker = asyncio.create_task(self._run())
+
+    def enqueue(self, chat_id: int, text: str, trace: Optional[TraceKey] = None) -> None:
+        self.pending[chat_id].append((text, trace))
+
+    def flush(self) -> None:
+        # Сигналы одного цикла для чата объединяются в одно сообщение
+        self.start()
+        for chat_id, messages in self.pending.items():
+            traces = [trace for _, trace in messages if trace is not None]
+            for digest in split_digest([text for text, _ in messages]):
+                self.queue.put_nowait((chat_id, digest, traces))
+        self.pending.clear()
+
+    async def _wait_for_slot(self, chat_id: int) -> None:
+        now = monotonic()
+        ready_at = max(self.last_sent + 1 / tg_global_rate, self.last_sent_by_chat.get(chat_id, 0) + tg_chat_interval)
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+        self.last_sent = self.last_sent_by_chat[chat_id] = monotonic()
+
+    async def _send(self, chat_id: int, text: str) -> bool:
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True
+        }
+        attempts = 0
+        # Единственный обработчик очереди не должен зависать на одном чате
+        deadline = monotonic() + tg_max_retry_time
+        while attempts < attempts_to_send_tg_msg:
+            await self._wait_for_slot(chat_id)
+            try:
+                response = await self.client.post("sendMessage", data=payload)
+            except Exception as e:
+                attempts += 1
+                logger.error(f"Ошибка при выполнении запроса (Попытка {attempts}): {e}")
+                await asyncio.sleep(tg_send_timeout)
+                continue
+            if response.status_code == 429:
+                attempts += 1
+                retry_after = response.json().get('parameters', {}).get('retry_after', tg_send_timeout)
+                if monotonic() + retry_after > deadline:
+                    logger.error(f"Превышен лимит Telegram, сообщение отброшено | чат: {chat_id}; "
+                                 f"retry_after: {retry_after} с")
+                    return False
+                logger.warning(f"Превышен лимит Telegram, повтор через {retry_after} с (Попытка {attempts}) | "
+                               f"чат: {chat_id}")
+                await asyncio.sleep(retry_after)
+                continue
+            if response.is_error:
+                logger.error(f"Telegram отклонил сообщение | чат: {chat_id}; ответ: {response.text}")
+            return not response.is_error
+        logger.error(f"Не удалось отправить сообщение после {attempts_to_send_tg_msg} попыток | чат: {chat_id}")
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            chat_id, text, traces = await self.queue.get()
+            try:
+                if await self._send(chat_id, text):
+                    for trace in traces:
+                        latency_tracker.mark(*trace, 'delivered')
+            except Exception as e:
+                logger.error(f"Ошибка отправки сообщения | чат: {chat_id}; {e}")
+            finally:
+                self.queue.task_done()
+
+    async def close(self) -> None:
+        if self.worker is not None and not self.worker.done():
+            # Дожидаемся отправки уже поставленных в очередь сообщений
+            await self.queue.join()
+            self.worker.cancel()
+        if self.client is not None:
+            await self.client.aclose()
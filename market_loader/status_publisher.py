@@ -0,0 +1,68 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from market_loader.constants import ema_cross_window, status_interval, status_key, status_spans, status_ttl
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import TickerStatus
+from market_loader.utils import calculate_percentage, get_start_time
+
+
+class StatusPublisher:
+    # Сводка по тикерам для команд бота собирается раз за цикл, бот читает ее из Redis без запросов к Postgres
+
+    def __init__(self, db: BotPostgresRepository, redis: Redis, interval: str = status_interval,
+                 spans: list[int] = status_spans, key: str = status_key, ttl: int = status_ttl):
+        self.db = db
+        self.redis = redis
+        self.interval = interval
+        self.spans = spans
+        self.key = key
+        self.ttl = ttl
+
+    async def _collect(self) -> list[TickerStatus]:
+        tickers = await self.db.get_tickers_with_figi()
+        candles = (await self.db.get_last_two_candles_by_interval([self.interval])).get(self.interval, {})
+        emas = await self.db.get_last_two_emas_by_interval([(self.interval, span) for span in self.spans])
+        end_time = datetime.now(timezone.utc)
+        start_time = get_start_time(end_time, ema_cross_window).replace(tzinfo=None)
+        crosses = Counter(ticker_id for ticker_id, _ in
+                          await self.db.get_ema_crosses_since(self.interval, self.spans[0], start_time))
+        statuses = []
+        for ticker in tickers:
+            ticker_candles = candles.get(ticker.ticker_id)
+            if not ticker_candles:
+                continue
+            latest_candle = ticker_candles[0]
+            latest_emas = {span: emas.get((self.interval, span), {}).get(ticker.ticker_id) for span in self.spans}
+            latest_emas = {span: ticker_emas[0] for span, ticker_emas in latest_emas.items() if ticker_emas}
+            status = TickerStatus(ticker_id=ticker.ticker_id, name=ticker.name, interval=self.interval,
+                                  timestamp_column=latest_candle.timestamp_column, close=latest_candle.close,
+                                  emas={span: ema.ema for span, ema in latest_emas.items()},
+                                  cross_count=crosses[ticker.ticker_id], updated_at=end_time)
+            main_ema = latest_emas.get(self.spans[0])
+            if main_ema is not None and main_ema.atr:
+                status.atr_percent = calculate_percentage(main_ema.atr, main_ema.ema)
+                status.atr_distance = round((latest_candle.close - main_ema.ema) / main_ema.atr, 2)
+            statuses.append(status)
+        return statuses
+
+    async def publish(self) -> None:
+        statuses = await self._collect()
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self.key)
+                if statuses:
+                    pipe.hset(self.key, mapping={status.name: status.model_dump_json() for status in statuses})
+                    pipe.expire(self.key, self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Не удалось опубликовать сводку по тикерам: {e}")
+            return
+        logger.info(f"Опубликована сводка по тикерам | тикеров: {len(statuses)}")
+
+    async def close(self) -> None:
+        await self.redis.close()
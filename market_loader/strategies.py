@@ -0,0 +1,170 @@
+import inspect
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional
+
+from loguru import logger
+
+from market_loader.constants import ema_cross_window, rebound_timeframes
+from market_loader.ema_cross_counter import EmaCrossCounter
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import Candle, CandleInterval, Ema, Signal
+from market_loader.utils import get_interval_form_str, get_rebound_message, get_start_time
+
+strategy_registry: dict[str, type['Strategy']] = {}
+
+
+def register_strategy(name: str):
+    def decorator(cls: type['Strategy']) -> type['Strategy']:
+        if inspect.isabstract(cls):
+            raise TypeError(f"Стратегия {name} не реализует {', '.join(sorted(cls.__abstractmethods__))}")
+        cls.name = name
+        strategy_registry[name] = cls
+        return cls
+    return decorator
+
+
+def get_strategy_class(name: str) -> Optional[type['Strategy']]:
+    return strategy_registry.get(name.strip().lower())
+
+
+class MarketSnapshot:
+    # Данные загружаются один раз за цикл и переиспользуются всеми стратегиями
+
+    def __init__(self, db: BotPostgresRepository, as_of: Optional[datetime] = None):
+        # as_of - срез на момент пропущенной свечи при досчете после перезапуска
+        self.db = db
+        self.as_of = as_of
+        self._candles: dict[str, dict[int, list[Candle]]] = {}
+        self._emas: dict[tuple[str, int], dict[int, list[Ema]]] = {}
+        self._ticker_names: Optional[dict[int, str]] = None
+
+    async def preload(self, intervals: set[str], ema_keys: set[tuple[str, int]]) -> None:
+        intervals = sorted(intervals - self._candles.keys())
+        ema_keys = sorted(ema_keys - self._emas.keys())
+        if intervals:
+            self._candles.update(await self.db.get_last_two_candles_by_interval(intervals, self.as_of))
+        if ema_keys:
+            self._emas.update(await self.db.get_last_two_emas_by_interval(ema_keys, self.as_of))
+
+    @property
+    def now(self) -> datetime:
+        return self.as_of.replace(tzinfo=timezone.utc) if self.as_of else datetime.now(timezone.utc)
+
+    async def candles(self, interval: str) -> dict[int, list[Candle]]:
+        await self.preload({interval}, set())
+        return self._candles[interval]
+
+    async def emas(self, interval: str, span: int) -> dict[int, list[Ema]]:
+        await self.preload(set(), {(interval, span)})
+        return self._emas[(interval, span)]
+
+    async def ticker_name(self, ticker_id: int) -> Optional[str]:
+        if self._ticker_names is None:
+            self._ticker_names = {ticker.ticker_id: ticker.name for ticker in await self.db.get_tickers_with_figi()}
+        return self._ticker_names.get(ticker_id)
+
+
+class Strategy(ABC):
+    name = ''
+
+    def __init__(self, cross_counter: EmaCrossCounter):
+        self.cross_counter = cross_counter
+
+    def requirements(self, interval: str) -> tuple[set[str], set[tuple[str, int]]]:
+        return {interval}, set()
+
+    async def prepare(self, interval: str, since: Optional[datetime] = None) -> None:
+        pass
+
+    async def is_ready(self, snapshot: MarketSnapshot, interval: str, ticker_id: int) -> bool:
+        return True
+
+    @abstractmethod
+    async def evaluate(self, snapshot: MarketSnapshot, interval: str, ticker_id: int) -> list[Signal]:
+        ...
+
+
+@register_strategy('rebound')
+class ReboundStrategy(Strategy):
+    span = 200
+
+    def __init__(self, cross_counter: EmaCrossCounter):
+        super().__init__(cross_counter)
+        self.prepared: set[str] = set()
+
+    @staticmethod
+    def _timeframe(interval: str) -> dict:
+        # Старший таймфрейм для подтверждения задается в rebound_timeframes
+        return rebound_timeframes.get(interval, {'older_interval': interval, 'older_span': 1000,
+                                                 'candle_interval': CandleInterval.hour.value})
+
+    def requirements(self, interval: str) -> tuple[set[str], set[tuple[str, int]]]:
+        timeframe = self._timeframe(interval)
+        return ({interval, timeframe['candle_interval']},
+                {(interval, self.span), (timeframe['older_interval'], timeframe['older_span'])})
+
+    async def prepare(self, interval: str, since: Optional[datetime] = None) -> None:
+        if interval in self.prepared:
+            return
+        logger.info(f"Начали обновление данных о пересечении EMA | интервал: {get_interval_form_str(interval)}")
+        end_time = datetime.now(timezone.utc).replace(tzinfo=None)
+        start_time = get_start_time(end_time, ema_cross_window).replace(tzinfo=None)
+        # После перезапуска пересечения досчитываются только со свечи из контрольной точки
+        replay_from = max(since, start_time) if since else start_time
+        added = await self.cross_counter.db.add_ema_crosses_since(interval, self.span, replay_from)
+        # Для пропущенных свечей окно подсчета пересечений начинается раньше текущего
+        await self.cross_counter.load(interval, self.span,
+                                      min(get_start_time(replay_from, ema_cross_window).replace(tzinfo=None),
+                                          start_time))
+        self.prepared.add(interval)
+        logger.info(f"Закончили обновление данных о пересечении EMA | добавлено: {added}")
+
+    def _save_and_get_cross_count(self, ticker_id: int, interval: str, curr_ema: Ema, end_time: datetime) -> int:
+        # Повторная проверка свечи исключена контрольной точкой, поэтому пересечение, уже досчитанное
+        # при запуске, тоже учитывается
+        self.cross_counter.add(ticker_id, interval, curr_ema.span, curr_ema.timestamp_column)
+        return self.cross_counter.count(ticker_id, interval, curr_ema.span,
+                                        get_start_time(end_time, ema_cross_window).replace(tzinfo=None),
+                                        end_time.replace(tzinfo=None))
+
+    async def is_ready(self, snapshot: MarketSnapshot, interval: str, ticker_id: int) -> bool:
+        # Свеча проверяется только после записи EMA на нее, иначе сравнение идет с EMA предыдущей свечи
+        candles = (await snapshot.candles(interval)).get(ticker_id)
+        emas = (await snapshot.emas(interval, self.span)).get(ticker_id)
+        return bool(candles and emas) and emas[0].timestamp_column == candles[0].timestamp_column
+
+    async def evaluate(self, snapshot: MarketSnapshot, interval: str, ticker_id: int) -> list[Signal]:
+        timeframe = self._timeframe(interval)
+        candles = (await snapshot.candles(interval)).get(ticker_id, [])
+        emas = (await snapshot.emas(interval, self.span)).get(ticker_id, [])
+        older_emas = (await snapshot.emas(timeframe['older_interval'], timeframe['older_span'])).get(ticker_id, [])
+        if len(candles) < 2 or len(emas) < 2 or not older_emas:
+            return []
+        latest_candle, prev_candle = candles
+        curr_ema, prev_ema = emas
+        older_ema = older_emas[0]
+        if latest_candle.high >= curr_ema.ema and prev_candle.high < prev_ema.ema:
+            direction = 'SHORT'
+        elif prev_candle.low > prev_ema.ema and latest_candle.low <= curr_ema.ema:
+            direction = 'LONG'
+        else:
+            return []
+
+        end_time = snapshot.now
+        cross_count_4 = self._save_and_get_cross_count(ticker_id, interval, curr_ema, end_time)
+        cross_count_1 = self.cross_counter.count(ticker_id, interval, curr_ema.span,
+                                                 get_start_time(end_time, 1).replace(tzinfo=None),
+                                                 end_time.replace(tzinfo=None))
+        hour_candles = (await snapshot.candles(timeframe['candle_interval'])).get(ticker_id)
+        hour_candle = hour_candles[0] if hour_candles else None
+        if not (hour_candle and 1 <= cross_count_4 <= 2 and cross_count_1 == 1):
+            return []
+        if direction == 'SHORT' and not (curr_ema.ema < older_ema.ema and hour_candle.open < curr_ema.ema):
+            return []
+        if direction == 'LONG' and not (curr_ema.ema > older_ema.ema and hour_candle.open > curr_ema.ema):
+            return []
+        message = get_rebound_message(await snapshot.ticker_name(ticker_id), curr_ema, older_ema,
+                                      CandleInterval(interval), CandleInterval(timeframe['older_interval']),
+                                      latest_candle, prev_candle, cross_count_4, direction)
+        return [Signal(ticker_id=ticker_id, direction=direction, message=message)]
@@ -1,131 +1,147 @@
-import asyncio
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from typing import Optional
 
-import httpx
 from loguru import logger
 
-from market_loader.constants import attempts_to_send_tg_msg, ema_cross_window, tg_send_timeout
+from market_loader.constants import default_strategy_keys, ema_cross_window
+from market_loader.ema_cross_counter import EmaCrossCounter
 from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
-from market_loader.models import CandleInterval, Ema, ReboundParam
-from market_loader.utils import get_rebound_message, get_start_time, need_for_calculation
+from market_loader.latency import latency_tracker
+from market_loader.models import Candle, DirtyRange, EvaluatorCheckpoint
+from market_loader.notifier import TelegramNotifier
+from market_loader.strategies import get_strategy_class, MarketSnapshot, Strategy
+from market_loader.subscriber_index import SubscriberIndex
+from market_loader.utils import get_interval_form_str, get_start_time
+
+default_strategies = set(default_strategy_keys)
 
 
 class StrategyEvaluator:
 
     def __init__(self, db: BotPostgresRepository, token: str, chat_id: int):
         self.db = db
-        self.token = token
-        current_time = datetime.now(timezone.utc)
-        self.last_15_min_update = current_time
-        self.last_hour_update = current_time
-        self.last_day_update = current_time
+        self.notifier = TelegramNotifier(token)
         self.chat_id = chat_id
-        self.ema_window_count = ema_cross_window
-        self.need_for_cross_update = True
+        self.cross_counter = EmaCrossCounter(db)
+        self.subscribers = SubscriberIndex(db)
+        self.strategies: dict[str, Strategy] = {}
+        self.last_evaluated: Optional[dict[tuple[str, str, int], datetime]] = None
+
+    def _get_strategy(self, name: str) -> Strategy:
+        if name not in self.strategies:
+            self.strategies[name] = get_strategy_class(name)(self.cross_counter)
+        return self.strategies[name]
 
-    async def send_telegram_message(self, text: str) -> None:
-        base_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+    async def _get_missed_bars(self, name: str, interval: str, candles: dict[int, list[Candle]],
+                               ticker_ids: list[int], now: datetime) -> dict[int, list[datetime]]:
+        # Предпоследняя свеча новее контрольной точки - значит, между ними есть непроверенные свечи
+        gaps = {}
+        for ticker_id in ticker_ids:
+            checkpoint = self.last_evaluated.get((name, interval, ticker_id))
+            if checkpoint is not None and len(candles[ticker_id]) > 1 and \
+                    candles[ticker_id][1].timestamp_column > checkpoint:
+                gaps[ticker_id] = checkpoint
+        if not gaps:
+            return {}
+        # Сигналы старше окна подсчета пересечений уже неактуальны
+        window_start = get_start_time(now, ema_cross_window).replace(tzinfo=None)
+        timestamps = await self.db.get_candle_timestamps_since(interval, list(gaps), min(gaps.values()))
+        replay, skipped = {}, 0
+        for ticker_id, checkpoint in gaps.items():
+            missed = [timestamp for timestamp in timestamps.get(ticker_id, [])
+                      if timestamp > checkpoint and timestamp != candles[ticker_id][0].timestamp_column]
+            replay[ticker_id] = [timestamp for timestamp in missed if timestamp >= window_start]
+            skipped += len(missed) - len(replay[ticker_id])
+        logger.info(f"Досчет пропущенных свечей | стратегия: {name}; интервал: {get_interval_form_str(interval)}; "
+                    f"тикеров: {len(gaps)}; свечей: {sum(map(len, replay.values()))}")
+        if skipped:
+            logger.warning(f"Пропущенные свечи старше окна пересечений не проверены | стратегия: {name}; "
+                           f"интервал: {get_interval_form_str(interval)}; свечей: {skipped}")
+        return replay
 
-        payload = {
-            "chat_id": self.chat_id,
-            "text": text,
-            "parse_mode": "HTML",
-            "disable_web_page_preview": True
-        }
-        async with httpx.AsyncClient() as client:
-            attempts = 0
-            while attempts < attempts_to_send_tg_msg:
-                try:
-                    await client.post(base_url, data=payload)
-                    break
-                except Exception as e:
-                    attempts += 1
-                    logger.error(f"Ошибка при выполнении запроса (Попытка {attempts}): {e}")
-                    await asyncio.sleep(tg_send_timeout)
+    async def _evaluate(self, strategy: Strategy, snapshot: MarketSnapshot, name: str, interval: str,
+                        ticker_id: int, timestamp: datetime) -> tuple[int, set[int]]:
+        signals_found = await strategy.evaluate(snapshot, interval, ticker_id)
+        latency_tracker.mark(ticker_id, interval, timestamp, 'evaluated')
+        recipients = set()
+        for signal in signals_found:
+            trace = (ticker_id, interval, timestamp)
+            latency_tracker.mark_signal(*trace)
+            logger.info(f"Сигнал. {signal.message}")
+            chat_ids = set(self.subscribers.recipients(ticker_id, (name, interval), signal.direction,
+                                                       default_strategies))
+            if (name, interval) in default_strategies:
+                # Отладочный чат получает все сигналы стратегии по умолчанию, как и раньше
+                chat_ids.add(self.chat_id)
+            for chat_id in chat_ids:
+                self.notifier.enqueue(chat_id, signal.message, trace)
+            latency_tracker.mark(*trace, 'queued')
+            recipients |= chat_ids
+        return len(signals_found), recipients
 
-    async def check_strategy(self) -> None:
+    async def check_strategy(self, dirty: Optional[dict[tuple[int, str], DirtyRange]] = None) -> None:
         logger.info("Начали проверку стратегии")
-        current_time = datetime.now(timezone.utc)
-        intervals = [CandleInterval.min_5.value]
-        quantity_of_intervals = len(intervals)
-        for pos, interval in enumerate(intervals):
-            update_time = pos == (quantity_of_intervals - 1)
-            if need_for_calculation(self, interval, current_time, update_time):
-                await self._check_rebound(200, CandleInterval.min_5, 1000, CandleInterval.min_5)
+        snapshot = MarketSnapshot(self.db)
+        if self.last_evaluated is None:
+            self.last_evaluated = await self.db.get_evaluator_checkpoints()
+        await self.subscribers.refresh()
+        evaluated = []
+        strategy_keys = default_strategies | self.subscribers.strategy_keys()
+        # Свечи и EMA всех таймфреймов загружаются двумя запросами на цикл
+        intervals, ema_keys = set(), set()
+        for name, interval in strategy_keys:
+            strategy_intervals, strategy_ema_keys = self._get_strategy(name).requirements(interval)
+            intervals |= strategy_intervals
+            ema_keys |= strategy_ema_keys
+        await snapshot.preload(intervals, ema_keys)
+        now = snapshot.now
+        replay_snapshots: dict[datetime, MarketSnapshot] = {}
+        for name, interval in sorted(strategy_keys):
+            strategy = self._get_strategy(name)
+            await strategy.prepare(interval, min((timestamp for key, timestamp in self.last_evaluated.items()
+                                                  if key[:2] == (name, interval)), default=None))
+            candles = await snapshot.candles(interval)
+            ticker_ids = [ticker_id for ticker_id in candles
+                          if dirty is None or (ticker_id, interval) in dirty]
+            replay = await self._get_missed_bars(name, interval, candles, ticker_ids, now)
+            signals, recipients, not_ready = 0, set(), 0
+            for ticker_id in ticker_ids:
+                # Каждая комбинация стратегии и интервала проверяется один раз на новую свечу
+                key = (name, interval, ticker_id)
+                latest_timestamp = candles[ticker_id][0].timestamp_column
+                if self.last_evaluated.get(key) == latest_timestamp:
+                    continue
+                checkpoint = self.last_evaluated.get(key)
+                for timestamp in replay.get(ticker_id, []) + [latest_timestamp]:
+                    if timestamp == latest_timestamp:
+                        bar_snapshot = snapshot
+                    else:
+                        if timestamp not in replay_snapshots:
+                            replay_snapshots[timestamp] = MarketSnapshot(self.db, as_of=timestamp)
+                            await replay_snapshots[timestamp].preload(*strategy.requirements(interval))
+                        bar_snapshot = replay_snapshots[timestamp]
+                    if not await strategy.is_ready(bar_snapshot, interval, ticker_id):
+                        # Индикаторы еще не рассчитаны, свеча будет проверена в следующий раз
+                        not_ready += 1
+                        break
+                    found, chat_ids = await self._evaluate(strategy, bar_snapshot, name, interval, ticker_id,
+                                                           timestamp)
+                    signals, recipients = signals + found, recipients | chat_ids
+                    checkpoint = timestamp
+                # Контрольная точка сдвигается только до последней проверенной свечи
+                if checkpoint is not None and checkpoint != self.last_evaluated.get(key):
+                    self.last_evaluated[key] = checkpoint
+                    evaluated.append(EvaluatorCheckpoint(strategy=name, interval=interval, ticker_id=ticker_id,
+                                                         timestamp_column=checkpoint))
+            logger.info(f"Стратегия {name} | интервал: {get_interval_form_str(interval)}; "
+                        f"тикеров: {len(ticker_ids)}; сигналов: {signals}; получателей: {len(recipients)}; "
+                        f"ожидают EMA: {not_ready}")
+        self.notifier.flush()
+        await self.cross_counter.flush()
+        await self.db.save_evaluator_checkpoints(evaluated)
+        await self.db.save_signal_latencies(latency_tracker.pop_completed())
+        latency_tracker.prune()
+        # Досчитываемая свеча может быть старше текущей на целое окно, и ее окно начинается еще на окно раньше
+        oldest_replayable = get_start_time(datetime.now(timezone.utc), ema_cross_window)
+        self.cross_counter.trim(get_start_time(oldest_replayable, ema_cross_window).replace(tzinfo=None))
         logger.info("Завершили проверку стратегии")
-
-    async def _save_and_get_cross_count(self, ticker_id: int, interval: CandleInterval, curr_ema: Ema) -> int:
-        not_exist = await self.db.add_ema_cross(ticker_id, interval.value, curr_ema.span, curr_ema.timestamp_column)
-        if not_exist:
-            end_time = datetime.now(timezone.utc)
-            return await self.db.get_ema_cross_count(ticker_id, interval.value, curr_ema.span,
-                                                     get_start_time(end_time, ema_cross_window).replace(tzinfo=None),
-                                                     end_time.replace(tzinfo=None))
-        else:
-            return -1
-
-    async def _check_rebound(self, span: int, interval: CandleInterval, older_span: int,
-                             older_interval: CandleInterval):
-        if self.need_for_cross_update:
-            await self._update_cross_data()
-        candles = await self.db.get_last_two_candles_for_each_ticker(interval.value)
-        for ticker_id in candles:
-            curr_ema = await self.db.get_latest_ema_for_ticker(ticker_id, interval.value, span)
-            prev_ema = await self.db.get_penultimate_ema_for_ticker(ticker_id, interval.value, span)
-            older_ema = await self.db.get_latest_ema_for_ticker(ticker_id, older_interval.value, older_span)
-            prev_candle = candles[ticker_id][1]
-            latest_candle = candles[ticker_id][0]
-            ticker_name = await self.db.get_ticker_name_by_id(ticker_id)
-            if curr_ema and prev_ema and latest_candle.high >= curr_ema.ema and prev_candle.high < prev_ema.ema:
-                params = await self._get_rebound_params(ticker_id, interval, curr_ema)
-                if (params.hour_candle and 1 <= params.cross_count_4 <= 2 and curr_ema.ema < older_ema.ema
-                        and params.cross_count_1 == 1 and params.hour_candle.open < curr_ema.ema):
-                    message = get_rebound_message(ticker_name, curr_ema, older_ema, interval, older_interval,
-                                                  latest_candle, prev_candle, params.cross_count_4, 'SHORT')
-                    await self.send_telegram_message(message)
-                    logger.info(f"Сигнал. {message}")
-            if curr_ema and prev_ema and prev_candle.low > prev_ema.ema and (latest_candle.low <= curr_ema.ema):
-                params = await self._get_rebound_params(ticker_id, interval, curr_ema)
-                if (params.hour_candle and 1 <= params.cross_count_4 <= 2 and curr_ema.ema > older_ema.ema
-                        and params.cross_count_1 == 1 and params.hour_candle.open > curr_ema.ema):
-                    message = get_rebound_message(ticker_name, curr_ema, older_ema, interval, older_interval,
-                                                  latest_candle, prev_candle, params.cross_count_4, 'LONG')
-                    await self.send_telegram_message(message)
-                    logger.info(f"Сигнал. {message}")
-
-    async def _get_rebound_params(self, ticker_id: int, interval: CandleInterval, curr_ema: Ema) -> ReboundParam:
-        cross_count_4 = await self._save_and_get_cross_count(ticker_id, interval, curr_ema)
-        end_time = datetime.now(timezone.utc)
-        cross_count_1 = await self.db.get_ema_cross_count(ticker_id, interval.value, curr_ema.span,
-                                                          get_start_time(end_time, 1).replace(tzinfo=None),
-                                                          end_time.replace(tzinfo=None))
-        hour_candle = await self.db.get_last_candle(ticker_id, CandleInterval.hour.value)
-        return ReboundParam(cross_count_4=cross_count_4,
-                            cross_count_1=cross_count_1,
-                            hour_candle=hour_candle)
-
-    async def _update_cross_data(self):
-        logger.info("Начали обновление данных о пересечении EMA")
-        interval = CandleInterval.min_5
-        span = 200
-
-        end_time = datetime.now(timezone.utc).replace(tzinfo=None)
-        start_time = get_start_time(end_time, ema_cross_window).replace(tzinfo=None)
-        while start_time < end_time:
-            candles = await self.db.get_two_candles_for_each_ticker_by_period(interval.value, start_time)
-            for ticker_id in candles:
-                prev_candle = candles[ticker_id][1]
-                latest_candle = candles[ticker_id][0]
-                curr_ema = await self.db.get_ema_for_ticker_by_period(ticker_id, interval.value, span, start_time)
-                prev_ema = await self.db.get_penultimate_ema_for_ticker_by_period(ticker_id, interval.value, span,
-                                                                                  start_time)
-                if (curr_ema and prev_ema and
-                        latest_candle.high >= curr_ema.ema and prev_candle.high < prev_ema.ema):
-                    await self.db.add_ema_cross(ticker_id, interval.value, curr_ema.span,
-                                                curr_ema.timestamp_column)
-                if curr_ema and prev_ema and prev_candle.low > prev_ema.ema and (latest_candle.low <= curr_ema.ema):
-                    await self.db.add_ema_cross(ticker_id, interval.value, curr_ema.span,
-                                                curr_ema.timestamp_column)
-            start_time = start_time + timedelta(seconds=300)
-        self.need_for_cross_update = False
-        logger.info("Закончили обновление данных о пересечении EMA")
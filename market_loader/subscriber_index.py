@@ -0,0 +1,68 @@
+from collections import defaultdict
+from time import monotonic
+from typing import Optional
+
+from loguru import logger
+
+from market_loader.constants import subscribers_rebuild_interval
+from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
+from market_loader.models import UserTicker
+from market_loader.strategies import get_strategy_class
+from market_loader.utils import get_interval_from_timeframe
+
+
+class SubscriberIndex:
+
+    def __init__(self, db: BotPostgresRepository, rebuild_interval: float = subscribers_rebuild_interval):
+        self.db = db
+        self.rebuild_interval = rebuild_interval
+        self.by_ticker: dict[int, dict[int, Optional[str]]] = defaultdict(dict)
+        self.strategies_by_user: dict[int, set[tuple[str, str]]] = {}
+        self.watermark = 0
+        self.rebuilt_at: Optional[float] = None
+
+    @staticmethod
+    def _add(by_ticker: dict[int, dict[int, Optional[str]]], user_ticker: UserTicker) -> None:
+        # Направление None означает подписку на сигналы в обе стороны
+        by_ticker[user_ticker.ticker_id][user_ticker.user_id] = (
+            user_ticker.direction.upper() if user_ticker.direction else None)
+
+    async def refresh(self) -> None:
+        # Между полными пересборками подтягиваются только новые подписки; удаления, смена направления
+        # и отключенные пользователи учитываются при пересборке
+        rebuild = self.rebuilt_at is None or monotonic() - self.rebuilt_at >= self.rebuild_interval
+        by_ticker = defaultdict(dict) if rebuild else self.by_ticker
+        watermark = 0 if rebuild else self.watermark
+        user_tickers = await self.db.get_user_tickers_since(watermark)
+        for user_ticker in user_tickers:
+            self._add(by_ticker, user_ticker)
+            watermark = max(watermark, user_ticker.user_ticker_id)
+        self.by_ticker, self.watermark = by_ticker, watermark
+        if rebuild:
+            self.rebuilt_at = monotonic()
+
+        strategies_by_user = defaultdict(set)
+        for active_strategy in await self.db.get_active_strategies():
+            strategy_class = get_strategy_class(active_strategy.strategy_name)
+            interval = get_interval_from_timeframe(active_strategy.timeframe_name)
+            if strategy_class is None or interval is None:
+                logger.error(f"Неизвестная стратегия или таймфрейм: {active_strategy.strategy_name}; "
+                             f"{active_strategy.timeframe_name}")
+                continue
+            for user_id in active_strategy.user_ids:
+                strategies_by_user[user_id].add((strategy_class.name, interval))
+        self.strategies_by_user = dict(strategies_by_user)
+        if user_tickers:
+            logger.info(f"Обновлен индекс подписчиков | подписок загружено: {len(user_tickers)}")
+
+    def strategy_keys(self) -> set[tuple[str, str]]:
+        return set().union(*self.strategies_by_user.values())
+
+    def recipients(self, ticker_id: int, strategy_key: tuple[str, str], direction: str,
+                   default_strategies: set[tuple[str, str]]) -> list[int]:
+        # Пользователи без выбранных стратегий получают сигналы стратегии по умолчанию
+        return [
+            user_id for user_id, user_direction in self.by_ticker.get(ticker_id, {}).items()
+            if (user_direction is None or user_direction == direction)
+            and strategy_key in self.strategies_by_user.get(user_id, default_strategies)
+        ]
@@ -1,73 +1,190 @@
+from collections import defaultdict
 from datetime import datetime
-from datetime import timezone
+from typing import Optional
 
+import numpy as np
 from loguru import logger
-from pandas import DataFrame
 
-from market_loader.constants import atr_period
+from market_loader.constants import atr_warmup, incremental_ema
+from market_loader.history_rebuilder import HistoryRebuilder
+from market_loader.indicator_engine import BatchIndicatorEngine
+from market_loader.indicator_pipeline import IndicatorPipeline
+from market_loader.indicators import continue_ema, update_atr_state
 from market_loader.infrasturcture.postgres_repository import BotPostgresRepository
-from market_loader.models import Ema
-from market_loader.utils import convert_to_date, get_interval_form_str, need_for_calculation
+from market_loader.latency import latency_tracker
+from market_loader.models import AtrState, CandleInterval, DirtyRange, Ema, Ticker
+from market_loader.utils import get_interval_form_str
 
 
 class TechnicalIndicatorsCalculator:
 
     def __init__(self, db: BotPostgresRepository):
         self.db = db
-        current_time = datetime.now(timezone.utc).replace(hour=7, minute=0, second=0, microsecond=0)
-        self.last_15_min_update = current_time
-        self.last_hour_update = current_time
-        self.last_day_update = current_time
+        self.engine = BatchIndicatorEngine(db)
+        self.rebuilder = HistoryRebuilder(db)
+        self.indicator_pipeline = IndicatorPipeline(db, self.rebuilder)
+        self.last_candles: dict[tuple[int, str], datetime] = {}
+        self.new_candles: dict[tuple[int, str], datetime] = {}
+        self.pending: set[tuple[int, str]] = set()
+        self.backfills: dict[tuple[int, str], datetime] = {}
+        self.atr_states: Optional[dict[tuple[int, str], AtrState]] = None
+        self.atr_values: dict[tuple[int, str], dict[datetime, float]] = {}
+        self.changed_atr_states: set[tuple[int, str]] = set()
 
-    async def _save_data_frame(self, df: DataFrame, ticker_id: int, interval: str, span: int) -> None:
-        df['ema'] = df['close'].ewm(span=span, adjust=False).mean()
-        df['high_minus_low'] = df['high'] - df['low']
-        df['high_minus_close_prev'] = abs(df['high'] - df['close'].shift(1))
-        df['low_minus_close_prev'] = abs(df['low'] - df['close'].shift(1))
-        df['tr'] = df[['high_minus_low', 'high_minus_close_prev', 'low_minus_close_prev']].max(axis=1)
-        df['atr'] = df['tr'].rolling(window=atr_period).mean()
+    def _recalculate(self, ticker: Ticker, interval: str, spans: list[int]) -> None:
+        self.rebuilder.submit(ticker.ticker_id, ticker.name, interval, spans)
 
-        last_ema = await self.db.get_latest_ema_for_ticker(ticker_id, interval, span)
-        if last_ema is not None:
-            filtered_df = df[df['timestamp_column'] > last_ema.timestamp_column]
+    async def _advance_atr(self, ticker: Ticker, interval: str) -> dict[datetime, float]:
+        key = (ticker.ticker_id, interval)
+        if key in self.atr_values:
+            return self.atr_values[key]
+        state = self.atr_states.get(key)
+        if state is None:
+            state = AtrState(ticker_id=ticker.ticker_id, interval=interval)
+            df = await self.db.get_data_for_ema(ticker.ticker_id, interval, atr_warmup)
         else:
-            filtered_df = df
-        list_of_rows = [
-            Ema(
-                ticker_id=ticker_id,
-                interval=interval,
-                span=span,
-                timestamp_column=row['timestamp_column'],
-                ema=row['ema'],
-                atr=row['atr'],
-            )
-            for index, row in filtered_df.iterrows()
-        ]
-        await self.db.bulk_add_ema(list_of_rows)
+            df = await self.db.get_data_since(ticker.ticker_id, interval, state.timestamp_column, 0)
+            df = df[df['timestamp_column'] > state.timestamp_column]
+        values = {
+            row.timestamp_column: update_atr_state(state, row.timestamp_column.to_pydatetime(), float(row.high),
+                                                   float(row.low), float(row.close))
+            for row in df.itertuples()
+        }
+        if values:
+            self.atr_states[key] = state
+            self.changed_atr_states.add(key)
+        self.atr_values[key] = values
+        return values
+
+    async def _update_ema(self, ticker: Ticker, interval: str, spans: list[int]) -> None:
+        last_emas = await self.db.get_latest_emas(interval, spans, [ticker.ticker_id])
+        to_recalculate = [span for span in spans if (ticker.ticker_id, span) not in last_emas]
+        if last_emas:
+            since = min(ema.timestamp_column for ema in last_emas.values())
+            df = await self.db.get_data_since(ticker.ticker_id, interval, since, 0)
+            atr_values = await self._advance_atr(ticker, interval)
+            rows = []
+            for (_, span), last_ema in last_emas.items():
+                last_pos = np.flatnonzero(df['timestamp_column'] == last_ema.timestamp_column)
+                new_df = df.iloc[last_pos[0] + 1:] if len(last_pos) else None
+                if new_df is None or not all(timestamp in atr_values for timestamp in new_df['timestamp_column']):
+                    logger.info(f"Пропуск в свечах, полный пересчет EMA | тикер: {ticker.name}; span: {span}")
+                    to_recalculate.append(span)
+                    continue
+                ema_values = continue_ema(new_df['close'].to_numpy(), span, last_ema.ema)
+                rows.extend(
+                    Ema(ticker_id=ticker.ticker_id, interval=interval, span=span, timestamp_column=timestamp,
+                        ema=ema, atr=atr_values[timestamp])
+                    for timestamp, ema in zip(new_df['timestamp_column'], ema_values)
+                )
+            await self.db.bulk_add_ema(rows)
+        if to_recalculate:
+            self._recalculate(ticker, interval, to_recalculate)
 
     async def _init_ema(self) -> None:
         logger.info("Начали инициализацию EMA")
         tickers_ema_init_data = await self.db.get_tickers_to_init_ema()
+        spans_by_ticker = defaultdict(list)
         for ticker in tickers_ema_init_data:
-            logger.info((f"Инициализация EMA | тикер: {ticker.name}; "
-                         f"интервал: {get_interval_form_str(ticker.interval)}; span: {ticker.span}"))
-            df = await self.db.get_data_for_init_ema(ticker.ticker_id, ticker.interval)
-            await self._save_data_frame(df, ticker.ticker_id, ticker.interval, ticker.span)
-        logger.info("Заверишили инициализацию EMA")
+            spans_by_ticker[(ticker.ticker_id, ticker.name, ticker.interval)].append(ticker.span)
+        for (ticker_id, name, interval), spans in spans_by_ticker.items():
+            if not self.rebuilder.is_busy(ticker_id, interval):
+                logger.info((f"Инициализация EMA | тикер: {name}; "
+                             f"интервал: {get_interval_form_str(interval)}; span: {spans}"))
+                self.rebuilder.submit(ticker_id, name, interval, spans, full_history=True)
+        logger.info("Заверишили постановку инициализации EMA")
+
+    async def _get_tickers_with_new_candles(self, tickers: list[Ticker]) -> dict[str, list[Ticker]]:
+        intervals = [interval.value for interval in CandleInterval]
+        last_candles = await self.db.get_last_candle_timestamps([ticker.ticker_id for ticker in tickers], intervals)
+        tickers_by_interval = defaultdict(list)
+        for ticker in tickers:
+            for interval in intervals:
+                key = (ticker.ticker_id, interval)
+                if key in last_candles and last_candles[key] != self.last_candles.get(key):
+                    tickers_by_interval[interval].append(ticker)
+        self.new_candles.update(last_candles)
+        return tickers_by_interval
+
+    def _get_dirty_tickers(self, tickers: list[Ticker],
+                           dirty: dict[tuple[int, str], DirtyRange]) -> dict[str, list[Ticker]]:
+        # Пары, отложенные из-за пересчета истории, досчитываются вместе с новыми свечами
+        for key, dirty_range in dirty.items():
+            last_candle = self.last_candles.get(key)
+            if last_candle is not None and dirty_range.start <= last_candle:
+                logger.warning(f"Дозагружены свечи в уже рассчитанную историю | тикер id: {key[0]}; "
+                               f"интервал: {get_interval_form_str(key[1])}; с {dirty_range.start}")
+                self.backfills[key] = min(dirty_range.start, self.backfills.get(key, dirty_range.start))
+            self.new_candles[key] = max(dirty_range.end, last_candle or dirty_range.end)
+        keys = set(dirty) | self.pending
+        tickers_by_interval = defaultdict(list)
+        for ticker in tickers:
+            for interval in CandleInterval:
+                if (ticker.ticker_id, interval.value) in keys:
+                    tickers_by_interval[interval.value].append(ticker)
+        return tickers_by_interval
 
-    async def calculate(self) -> None:
+    def _rebuild_backfills(self, tickers: list[Ticker], spans_by_interval: dict[str, list[int]]) -> None:
+        # EMA и ATR после дозагруженной свечи неверны, пересчитываем историю с нее
+        names = {ticker.ticker_id: ticker.name for ticker in tickers}
+        for key, start in list(self.backfills.items()):
+            ticker_id, interval = key
+            if ticker_id not in names or interval not in spans_by_interval:
+                del self.backfills[key]
+                continue
+            if self.rebuilder.submit(ticker_id, names[ticker_id], interval, spans_by_interval[interval],
+                                     overwrite_from=start):
+                self.atr_states.pop(key, None)
+                del self.backfills[key]
+
+    async def calculate(self, dirty: Optional[dict[tuple[int, str], DirtyRange]] = None) -> None:
         await self._init_ema()
         logger.info("Начали расчет EMA")
+        if self.atr_states is None:
+            self.atr_states = await self.db.get_atr_states()
+        self.atr_values = {}
         ema_to_calc = await self.db.get_ema_params_to_calc()
         tickers = await self.db.get_tickers_with_figi()
-        quantity_of_tickers = len(tickers)
-        for pos, ticker in enumerate(tickers):
-            for ema_params in ema_to_calc:
-                update_time = pos == (quantity_of_tickers - 1)
-                if need_for_calculation(self, ema_params.interval, datetime.now(timezone.utc), update_time):
-                    logger.info(
-                        (f"EMA | тикер: {ticker.name}; интервал: {get_interval_form_str(ema_params.interval)}; "
-                         f"span: {ema_params.span}"))
-                    df = await self.db.get_data_for_ema(ticker.ticker_id, ema_params.interval, ema_params.span)
-                    await self._save_data_frame(df, ticker.ticker_id, ema_params.interval, ema_params.span)
+        if dirty is None or not self.last_candles:
+            tickers_by_interval = await self._get_tickers_with_new_candles(tickers)
+        else:
+            tickers_by_interval = self._get_dirty_tickers(tickers, dirty)
+        self.pending = {(ticker.ticker_id, interval) for interval, interval_tickers in tickers_by_interval.items()
+                        for ticker in interval_tickers}
+        spans_by_interval = defaultdict(list)
+        for ema_params in ema_to_calc:
+            spans_by_interval[ema_params.interval].append(ema_params.span)
+        self._rebuild_backfills(tickers, spans_by_interval)
+        for interval, spans in spans_by_interval.items():
+            ready_tickers = [ticker for ticker in tickers_by_interval[interval]
+                             if not self.rebuilder.is_busy(ticker.ticker_id, interval)]
+            tickers_by_interval[interval] = ready_tickers
+            if not ready_tickers:
+                continue
+            processed = (await self.engine.run(interval, spans, ready_tickers, self.atr_states) if incremental_ema
+                         else set())
+            for ticker in ready_tickers:
+                if ticker.ticker_id in processed:
+                    continue
+                logger.info(f"EMA | тикер: {ticker.name}; интервал: {get_interval_form_str(interval)}; span: {spans}")
+                if incremental_ema:
+                    await self._update_ema(ticker, interval, spans)
+                else:
+                    await self.rebuilder.rebuild(ticker.ticker_id, ticker.name, interval, spans)
+        await self.db.save_atr_states([self.atr_states[key] for key in self.changed_atr_states])
+        self.changed_atr_states.clear()
+        for interval in spans_by_interval:
+            for ticker in tickers_by_interval[interval]:
+                if not self.rebuilder.is_busy(ticker.ticker_id, interval):
+                    latency_tracker.mark(ticker.ticker_id, interval, self.new_candles[(ticker.ticker_id, interval)],
+                                         'ema_computed')
         logger.info("Заверишили расчет EMA")
+        await self.indicator_pipeline.run(tickers_by_interval)
+        for interval, interval_tickers in tickers_by_interval.items():
+            for ticker in interval_tickers:
+                key = (ticker.ticker_id, interval)
+                self.last_candles[key] = self.new_candles[key]
+                self.pending.discard(key)
+
+    def close(self) -> None:
+        self.rebuilder.shutdown()
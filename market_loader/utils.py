@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from typing import Optional
 
 import pytz
 from tzlocal import get_localzone
@@ -67,24 +68,13 @@ def get_interval_form_str_for_tw(interval: str) -> str:
         return 'D'
 
 
-def need_for_calculation(cls, interval: str, current_time: datetime, update_time: bool) -> bool:
-    if interval == CandleInterval.min_5.value:
-        return True
-    if (interval == CandleInterval.min_15.value
-            and (current_time - cls.last_15_min_update).total_seconds() >= 900):
-        if update_time:
-            cls.last_15_min_update = current_time.replace(second=0, microsecond=0)
-        return True
-    if (interval == CandleInterval.hour.value
-            and (current_time - cls.last_hour_update).total_seconds() >= 3660):
-        if update_time:
-            cls.last_hour_update = current_time.replace(minute=0, second=0, microsecond=0)
-        return True
-    if (interval == CandleInterval.day.value and (
-            current_time - cls.last_day_update).total_seconds() >= 3600) * 24 + 60:
-        if update_time:
-            cls.last_day_update = current_time.replace(minute=0, second=0, microsecond=0)
-        return True
+def get_interval_from_timeframe(timeframe: str) -> Optional[str]:
+    timeframe = timeframe.strip().lower()
+    for interval in CandleInterval:
+        if timeframe in (interval.value.lower(), get_interval_form_str(interval.value),
+                         str(get_interval_form_str_for_tw(interval.value)).lower()):
+            return interval.value
+    return None
 
 
 def convert_utc_to_local(utc_time: datetime) -> str:
@@ -160,23 +150,6 @@ def get_rebound_message(ticker_name: str, current_ema: Ema, older_ema: Ema, inte
             f'<a href="{make_tw_link(ticker_name, interval.value)}">График tradingview</a>')
 
 
-def transform_candle_result(result) -> dict:
-    candles_dict = {}
-    for row in result.mappings():
-        candle = Candle(
-            timestamp_column=row['timestamp_column'],
-            open=row['open'],
-            high=row['high'],
-            low=row['low'],
-            close=row['close']
-        )
-        if row['ticker_id'] in candles_dict:
-            candles_dict[row['ticker_id']].append(candle)
-        else:
-            candles_dict[row['ticker_id']] = [candle]
-    return candles_dict
-
-
 class MaxRetriesExceededError(Exception):
     def __init__(self, message="Max retries exceeded"):
         self.message = message
@@ -0,0 +1,61 @@
+"""07_market_event_notify
+
+Revision ID: 4e8a2b6f0c93
+Revises: 9a3e6c1d4b72
+Create Date: 2026-10-19 15:02:41.772903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a2b6f0c93'
+down_revision: Union[str, None] = '9a3e6c1d4b72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Триггеры уровня оператора: одно уведомление на пару тикер-интервал, а не на каждую строку пакета
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_market_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('market_events', json_build_object(
+                'table', TG_TABLE_NAME,
+                'ticker_id', ticker_id,
+                'interval', interval,
+                'timestamp', max_timestamp
+            )::text)
+            FROM (
+                SELECT ticker_id, interval, max(timestamp_column) AS max_timestamp
+                FROM changed_rows
+                GROUP BY ticker_id, interval
+            ) AS events;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER candles_notify_insert AFTER INSERT ON candles
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_market_event();
+    """)
+    op.execute("""
+        CREATE TRIGGER ema_notify_insert AFTER INSERT ON ema
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_market_event();
+    """)
+    op.execute("""
+        CREATE TRIGGER ema_notify_update AFTER UPDATE ON ema
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_market_event();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS ema_notify_update ON ema;")
+    op.execute("DROP TRIGGER IF EXISTS ema_notify_insert ON ema;")
+    op.execute("DROP TRIGGER IF EXISTS candles_notify_insert ON candles;")
+    op.execute("DROP FUNCTION IF EXISTS notify_market_event();")
@@ -0,0 +1,40 @@
+"""10_reference_data_notify
+
+Revision ID: 6d2f8b4a1e57
+Revises: e3c9a7f1b258
+Create Date: 2026-10-19 18:04:11.730926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2f8b4a1e57'
+down_revision: Union[str, None] = 'e3c9a7f1b258'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Справочники меняются редко, бот сбрасывает кэш меню по уведомлению
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_reference_data() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('reference_data', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table in ('strategies', 'timeframes'):
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data();
+        """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS timeframes_notify_change ON timeframes;")
+    op.execute("DROP TRIGGER IF EXISTS strategies_notify_change ON strategies;")
+    op.execute("DROP FUNCTION IF EXISTS notify_reference_data();")
@@ -0,0 +1,67 @@
+"""Replay recorded Telegram updates against a bot running in webhook mode.
+
+Updates are read from a file with one update per line, or from a saved getUpdates response:
+
+    curl "https://api.telegram.org/bot$BOT_TOKEN/getUpdates" > updates.json
+    python scripts/replay_updates.py updates.json --url http://localhost:8081/webhook --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+import aiohttp
+from dotenv import load_dotenv
+
+
+def load_updates(path: str) -> list[dict]:
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        return data.get("result", [data])
+    return data
+
+
+async def replay(updates: list[dict], url: str, secret: str, concurrency: int) -> Counter:
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+
+    async def post(session: aiohttp.ClientSession, update: dict) -> None:
+        async with semaphore:
+            try:
+                async with session.post(url, json=update, headers=headers) as response:
+                    statuses[response.status] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, update) for update in updates))
+    return statuses
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="POST recorded updates to the bot webhook")
+    parser.add_argument("path", help="file with updates: JSON lines or a getUpdates response")
+    default_url = f"http://localhost:{os.getenv('WEBHOOK_PORT', 8081)}{os.getenv('WEBHOOK_PATH', '/webhook')}"
+    parser.add_argument("--url", default=default_url)
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET", ""))
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    updates = load_updates(args.path)
+    started = time.monotonic()
+    statuses = asyncio.run(replay(updates, args.url, args.secret, args.concurrency))
+    elapsed = time.monotonic() - started
+    print(f"updates: {len(updates)}; elapsed: {elapsed:.2f}s; statuses: {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()